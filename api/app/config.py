@@ -12,4 +12,5 @@ LOG_LEVEL = logging.DEBUG
 
 CACHE_FILLER_LOG = "/var/log/metawahl/cache_filler.log"
 CACHE_FILLER_LOG = "./cache_filler.log"
+CACHE_FILLER_WORKERS = 8
 WIKIDATA_UPDATE_LOG = "../wikidata_update.log"
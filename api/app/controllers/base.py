@@ -3,10 +3,11 @@
 from collections import defaultdict
 
 from flask import Blueprint, request
-from middleware.cache import cache_filler, is_cache_filler
+from middleware.cache import cache_filler, cached_view, is_cache_filler
 from middleware.json_response import json_response
-from models import Election, Tag, Thesis
-from services import cache, db
+from middleware.query_stats import query_budget
+from models import Election, FieldSet, Tag, Thesis, loader_profile
+from services import db
 from services.logger import logger
 from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
@@ -16,17 +17,21 @@ base_bp = Blueprint("base", __name__)
 
 @base_bp.route("/base")
 @cache_filler()
-@cache.cached()
+@cached_view(fields=True)
+@query_budget(5)
 def base_view():
     """Return base data set required by the web client."""
 
     if not is_cache_filler():
         logger.info(f"Cache miss for {request.path}")
 
+    fields = FieldSet.from_args(request.args)
     rv = {"data": dict()}
 
     try:
-        elections = db.session.execute(select(Election)).scalars().unique().all()
+        elections = db.session.execute(
+            select(Election).options(*loader_profile("election_list", fields))
+        ).scalars().all()
     except SQLAlchemyError as e:
         logger.error(e)
         return json_response({"error": "Server Error"})
@@ -34,7 +39,7 @@ def base_view():
     rv["data"]["elections"] = defaultdict(list)
     for election in elections:
         rv["data"]["elections"][election.territory].append(
-            election.to_dict(thesis_data=False)
+            election.to_dict(thesis_data=False, fields=fields)
         )
 
     tag_items = db.session.execute(
@@ -48,6 +53,7 @@ def base_view():
             thesis_count=item[1],
             query_root_status=True,
             include_related_tags="simple",
+            fields=fields,
         )
         for item in tag_items
     ]
@@ -3,10 +3,11 @@
 from collections import defaultdict
 
 from flask import Blueprint, request
-from middleware.cache import cache_filler, is_cache_filler
-from middleware.json_response import json_response
-from models import Election
-from services import cache, db
+from middleware.cache import cache_filler, cached_view, is_cache_filler
+from middleware.json_response import NORMALIZED_FORMAT, json_response, normalized_tags
+from middleware.query_stats import query_budget
+from models import Election, FieldSet, loader_profile
+from services import db
 from services.logger import logger
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
@@ -16,45 +17,60 @@ election_bp = Blueprint("election", __name__)
 
 @election_bp.route("/elections/<int:wom_id>")
 @cache_filler()
-@cache.cached()
+@cached_view(query_params=(NORMALIZED_FORMAT,), fields=True)
+@query_budget(5)
 def election_view(wom_id: int):
     """Election data and a list of its theses."""
     if not is_cache_filler():
         logger.info(f"Cache miss for {request.path}")
 
-    election = db.session.get(Election, wom_id)
+    fields = FieldSet.from_args(request.args)
+    election = db.session.get(
+        Election, wom_id, options=loader_profile("election_page", fields)
+    )
 
     if election is None:
         return json_response({"error": "Election not found"}, status=404)
 
+    tags = normalized_tags()
     rv = {
-        "data": election.to_dict(),
-        "theses": [thesis.to_dict() for thesis in election.theses],
+        "data": election.to_dict(fields=fields),
+        "theses": [
+            thesis.to_dict(tag_index=tags, fields=fields) for thesis in election.theses
+        ],
     }
 
+    if tags is not None:
+        rv["tags"] = tags
+
     return json_response(rv)
 
 
 @election_bp.route("/elections/")
 @cache_filler()
-@cache.cached()
+@cached_view(query_params=("thesis_data",), fields=True)
+@query_budget(3)
 def elections():
     """A list of all elections."""
     if not is_cache_filler():
         logger.info(f"Cache miss for {request.path}")
 
+    thesis_data = request.args.get("thesis_data", False)
+    profile = "election_list_with_theses" if thesis_data else "election_list"
+    fields = FieldSet.from_args(request.args)
+
     try:
-        all_elections = db.session.execute(select(Election)).scalars().unique().all()
+        all_elections = db.session.execute(
+            select(Election).options(*loader_profile(profile, fields))
+        ).scalars().all()
     except SQLAlchemyError as e:
         logger.error(e)
         return json_response({"error": "Server Error"})
 
-    thesis_data = request.args.get("thesis_data", False)
-
     rv = {"data": defaultdict(list)}
     for election in all_elections:
         rv["data"][election.territory].append(
-            election.to_dict(thesis_data=thesis_data)
+            election.to_dict(thesis_data=thesis_data, fields=fields)
         )
 
     return json_response(rv)
@@ -4,7 +4,8 @@ from flask import Blueprint, request
 from middleware.json_response import json_response
 from middleware.logger import log_request_info, logger
 from models import Election, QuizAnswer, Thesis
-from services import cache, db
+from services import db
+from services.quiz_tally import tally
 from sqlalchemy.exc import IntegrityError
 
 quiz_bp = Blueprint("quiz", __name__)
@@ -12,19 +13,18 @@ quiz_bp = Blueprint("quiz", __name__)
 
 @quiz_bp.route("/quiz/<int:election_num>", methods=["GET"])
 @quiz_bp.route("/quiz/<int:election_num>/<int:thesis_num>", methods=["GET"])
-@cache.cached(timeout=(5 * 60))
 def quiz_get(election_num, thesis_num=None):
     """Return a tally of how many users guessed yes/no for each thesis."""
-    rv = {}
     error = None
 
-    election = db.session.get(Election, election_num)
-    if election is None:
-        return json_response({"error": "Election not found"}, status=404)
+    rv = tally.get(election_num)
+    if rv is None:
+        tallies = Thesis.quiz_tallies(election_id=election_num)
+        if len(tallies) == 0 and db.session.get(Election, election_num) is None:
+            return json_response({"error": "Election not found"}, status=404)
 
-    for thesis in election.theses:
-        tnum = int(thesis.id[-2:])
-        rv[tnum] = thesis.quiz_tally()
+        rv = {int(thesis_id[-2:]): counts for thesis_id, counts in tallies.items()}
+        tally.store(election_num, rv)
 
     return json_response({"error": error, "data": rv})
 
@@ -71,6 +71,7 @@ def quiz_post(election_num, thesis_num=None):
                 logger.info("Ignored duplicate quiz answer")
             else:
                 logger.info(f"Added {qa}")
+                tally.increment(election_num, thesis_num, qa.answer)
 
     if error is None:
         rv = qa.to_dict()
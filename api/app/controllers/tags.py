@@ -1,72 +1,105 @@
 #!/usr/bin/env python
 
 from flask import Blueprint, current_app, request
-from middleware.cache import cache_filler, is_cache_filler
-from middleware.json_response import json_response
-from models import Tag, Thesis
-from services import cache, db
+from middleware.cache import cache_filler, cached_view, is_cache_filler
+from middleware.json_response import (
+    NORMALIZED_FORMAT,
+    json_response,
+    json_stream_response,
+    normalized_tags,
+)
+from middleware.query_stats import query_budget
+from models import FieldSet, Tag, Thesis, loader_profile
+from models.fields import ALL_FIELDS
+from services import db
 from services.logger import logger
 from sqlalchemy import func, select
 
 tags_bp = Blueprint("tags", __name__)
 
 
-def _tags_list(filename=None):
+# Tags read from the database at a time when streaming tag lists
+TAGS_YIELD_PER = 500
+
+
+def _tags_with_theses(fields=ALL_FIELDS):
+    """Yield all tags with the ids of their theses, read in batches."""
+    results = db.session.execute(
+        select(Tag)
+        .join(Tag.theses)
+        .group_by(Tag.title)
+        .order_by(Tag.title)
+        .options(*loader_profile("tag_list_with_theses", fields))
+        .execution_options(yield_per=TAGS_YIELD_PER)
+    ).scalars()
+    for tag in results:
+        yield tag.to_dict(include_theses_ids=True, fields=fields)
+
+
+def _tags_list(filename=None, fields=ALL_FIELDS):
     if not is_cache_filler():
         logger.info(f"Cache miss for {request.path}")
 
     if request.args.get("include_theses_ids", False) or filename is not None:
-        results = db.session.execute(
-            select(Tag).join(Tag.theses).group_by(Tag.title).order_by(Tag.title)
-        ).scalars().all()
-        rv = {"data": [tag.to_dict(include_theses_ids=True) for tag in results]}
-    else:
-        results = db.session.execute(
-            select(Tag, func.count(Thesis.id)).join(Tag.theses).group_by(Tag.title)
-        ).all()
-        rv = {"data": [item[0].to_dict(thesis_count=item[1]) for item in results]}
+        return json_stream_response(_tags_with_theses(fields), filename=filename)
 
-    return json_response(rv, filename=filename)
+    results = db.session.execute(
+        select(Tag, func.count(Thesis.id)).join(Tag.theses).group_by(Tag.title)
+    ).all()
+    rv = {"data": [item[0].to_dict(thesis_count=item[1], fields=fields) for item in results]}
+    return json_response(rv)
 
 
 @tags_bp.route("/tags/")
 @cache_filler()
-@cache.cached()
+@cached_view(query_params=("include_theses_ids",), fields=True)
+@query_budget(2)
 def tags_view():
     """List all tags."""
-    return _tags_list()
+    return _tags_list(fields=FieldSet.from_args(request.args))
 
 
 @tags_bp.route("/tags.json")
 @cache_filler()
-@cache.cached()
+@cached_view()
+@query_budget(2)
 def tags_download():
     return _tags_list(filename="tags.json")
 
 
 @tags_bp.route("/tags/<string:slug>")
 @cache_filler()
-@cache.cached()
+@cached_view(query_params=(NORMALIZED_FORMAT,), fields=True)
+@query_budget(8)
 def tag_view(slug: str):
     """Tag metadata, list of all related theses and their elections."""
     if not is_cache_filler():
         logger.info(f"Cache miss for {request.path}")
 
+    fields = FieldSet.from_args(request.args)
     tag = db.session.execute(
-        select(Tag).where(Tag.slug == slug.lower())
+        select(Tag)
+        .where(Tag.slug == slug.lower())
+        .options(*loader_profile("tag_page", fields))
     ).scalar_one_or_none()
 
     if tag is None:
         return json_response({"error": "Tag not found"}, status=404)
 
+    tags = normalized_tags()
+    elections = {thesis.election_id: thesis.election for thesis in tag.theses}
     rv = {
-        "data": tag.to_dict(include_related_tags="full"),
-        "theses": [thesis.to_dict() for thesis in tag.theses],
+        "data": tag.to_dict(include_related_tags="full", tag_index=tags, fields=fields),
+        "theses": [thesis.to_dict(tag_index=tags, fields=fields) for thesis in tag.theses],
         "elections": {
-            thesis.election_id: thesis.election.to_dict() for thesis in tag.theses
+            election_id: election.to_dict(fields=fields)
+            for election_id, election in elections.items()
         },
     }
 
+    if tags is not None:
+        rv["tags"] = tags
+
     return json_response(rv)
 
 
@@ -86,14 +119,21 @@ def tag_delete(slug: str):
 
     logger.warning(f"Removing {tag}")
 
+    fields = FieldSet.from_args(request.args)
+    tags = normalized_tags()
+    elections = {thesis.election_id: thesis.election for thesis in tag.theses}
     rv = {
-        "data": tag.to_dict(include_related_tags="full"),
-        "theses": [thesis.to_dict() for thesis in tag.theses],
+        "data": tag.to_dict(include_related_tags="full", tag_index=tags, fields=fields),
+        "theses": [thesis.to_dict(tag_index=tags, fields=fields) for thesis in tag.theses],
         "elections": {
-            thesis.election_id: thesis.election.to_dict() for thesis in tag.theses
+            election_id: election.to_dict(fields=fields)
+            for election_id, election in elections.items()
         },
     }
 
+    if tags is not None:
+        rv["tags"] = tags
+
     db.session.delete(tag)
     db.session.commit()
 
@@ -1,11 +1,12 @@
 #!/usr/bin/env python
 
 from flask import Blueprint, current_app, request
-from middleware.cache import cache_filler, is_cache_filler
-from middleware.json_response import json_response
+from middleware.cache import cache_filler, cached_view, is_cache_filler
+from middleware.json_response import NORMALIZED_FORMAT, json_response, normalized_tags
 from middleware.logger import log_request_info
-from models import Tag, Thesis
-from services import cache, db
+from middleware.query_stats import query_budget
+from models import FieldSet, Tag, Thesis, loader_profile
+from services import db
 from services.logger import logger
 from sqlalchemy import select
 
@@ -14,19 +15,30 @@ thesis_bp = Blueprint("thesis", __name__)
 
 @thesis_bp.route("/thesis/<string:thesis_id>")
 @cache_filler()
-@cache.cached()
+@cached_view(query_params=(NORMALIZED_FORMAT,), fields=True)
+@query_budget(8)
 def thesis_view(thesis_id: str):
     """Return metadata for a specific thesis."""
 
     if not is_cache_filler():
         logger.info(f"Cache miss for {request.path}")
 
-    thesis = db.session.get(Thesis, thesis_id)
+    fields = FieldSet.from_args(request.args)
+    thesis = db.session.get(
+        Thesis, thesis_id, options=loader_profile("thesis_list", fields)
+    )
 
     if thesis is None:
         return json_response({"error": "Thesis not found"}, status=404)
 
-    rv = {"data": thesis.to_dict(), "related": thesis.related()}
+    tags = normalized_tags()
+    rv = {
+        "data": thesis.to_dict(tag_index=tags, fields=fields),
+        "related": thesis.related(tag_index=tags, fields=fields),
+    }
+
+    if tags is not None:
+        rv["tags"] = tags
     return json_response(rv)
 
 
@@ -13,8 +13,15 @@ import controllers
 from flask import Flask
 from flask_cors import CORS
 from middleware.error import exceptions, page_not_found
+from middleware.invalidation import track_view_dependencies
+from middleware.json_provider import OrjsonProvider
 from middleware.logger import after_request, before_request, logger
+from middleware.query_stats import check_query_budget, track_queries
+from models.tag_graph import track_tag_changes
 from services import cache, db
+from services.db_pool import engine_options, instrument_engine
+from services.quiz_tally import tally
+from services.replicas import replicas
 
 API_NAME = config.API_NAME
 API_FULL_NAME = config.API_FULL_NAME
@@ -25,6 +32,7 @@ SITE_ROOT = config.SITE_ROOT
 
 def create_app(config=None):
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     app.config.update(config or {})
 
     try:
@@ -33,8 +41,17 @@ def create_app(config=None):
         logger.error(e)
         quit()
 
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
     db.init_app(app)
+    replicas.init_app(app)
+    with app.app_context():
+        for engine in [*db.engines.values(), *replicas.engines]:
+            instrument_engine(engine, app.config)
+            track_queries(engine)
     cache.init_app(app, config=app.config)
+    track_view_dependencies(db.session)
+    track_tag_changes(db.session)
+    tally.init_app(app)
 
     CORS(app, resources={rf"{API_ROOT}/*": {"origins": "*"}})
 
@@ -46,6 +63,7 @@ def create_app(config=None):
     app.logger.setLevel(logging.INFO)
 
     app.before_request(before_request)
+    app.after_request(check_query_budget)
     app.after_request(after_request)
 
     app.errorhandler(Exception)(exceptions)
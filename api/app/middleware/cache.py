@@ -1,26 +1,329 @@
 #!/usr/bin/env python
-"""Middleware to cache whole requests."""
+"""Middleware to cache whole requests.
 
+Cached views are kept fresh for `CACHE_DEFAULT_TIMEOUT` seconds (with some
+jitter so that keys filled together don't expire together). After that, a
+stale response is still served for up to `CACHE_STALE_TIMEOUT` seconds while
+a single worker recomputes it in the background.
+
+Views are stored as their final body bytes together with gzip and brotli
+compressed variants and a content hash, so that a cache hit only needs to pick
+the variant the client accepts, or answer with 304 Not Modified if the client
+already has it.
+
+Views accepting sparse fieldsets are cached for each canonical fieldset. These
+variants are too many to be evicted one by one, so their keys include a
+generation that changes whenever any view is evicted.
+"""
+
+import gzip
+import hashlib
 import logging
+import math
+import random
+import re
+import threading
+import time
 from functools import wraps
+from itertools import combinations
 
-from flask import request
+import brotli
+from flask import current_app, make_response, request, stream_with_context
+from flask_caching.backends import RedisCache
+from models import FieldSet
 from services import cache
+from services.tiered_cache import TieredRedisCache
+from werkzeug.exceptions import HTTPException
+
+# Marks requests that recompute a stale view in the background
+REFRESH_ENVIRON_KEY = "metawahl.cache_refresh"
+
+FIELDS_GENERATION_KEY = "view-fields-generation"
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+# Headers that depend on the representation served for a request
+REPRESENTATION_HEADERS = {"content-length", "content-encoding", "etag", "vary"}
+
+# The render time and query stats in the meta section of JSON responses change
+# every time a view is recomputed and are left out of the content hash
+RENDER_STATS_RE = re.compile(rb'(?<!\\)"(?:render_time": ?"[^"]*"|queries": ?\{[^}]*\})')
 
 
 def is_cache_filler():
     return request.args.get("force_cache_miss") is not None
 
 
+def view_key(path, flags=()):
+    """Return the cache key under which the view for `path` is stored.
+
+    :param flags: query parameters which are set for this variant of the view
+    """
+    if len(flags) == 0:
+        return f"view/{path}"
+    return f"view/{path}?{variant_query(flags)}"
+
+
+def variant_query(flags):
+    """Return the canonical query string for a set of flags."""
+    return "&".join(flag if "=" in flag else f"{flag}=1" for flag in sorted(flags))
+
+
+def request_flags(query_params):
+    """Return those of the view's query parameters set in this request.
+
+    Parameters with an empty value count as not set, just like in the views.
+    Parameters given as `name=value` are only set with exactly that value.
+    """
+    rv = []
+    for param in query_params:
+        name, _, value = param.partition("=")
+        arg = request.args.get(name)
+        if arg and (not value or arg == value):
+            rv.append(param)
+    return rv
+
+
+def variant_keys(path):
+    """Return the cache keys of all variants of the view for `path`."""
+    query_params = ()
+    try:
+        endpoint, _ = current_app.url_map.bind("localhost").match(path, method="GET")
+    except HTTPException:
+        pass
+    else:
+        view = current_app.view_functions[endpoint]
+        query_params = getattr(view, "cache_query_params", ())
+
+    return [
+        view_key(path, flags)
+        for n in range(len(query_params) + 1)
+        for flags in combinations(query_params, n)
+    ]
+
+
+def fields_variant_key(key):
+    """Return the key of a sparse fieldset variant of a view."""
+    return f"{key}@{cache.get(FIELDS_GENERATION_KEY)}"
+
+
+def evict_views(paths):
+    """Delete the cached views for all given paths in one round trip."""
+    keys = [key for path in paths for key in variant_keys(path)]
+    if len(keys) == 0:
+        return
+
+    cache.set(FIELDS_GENERATION_KEY, time.time_ns(), timeout=0)
+
+    backend = cache.cache
+    if isinstance(backend, TieredRedisCache):
+        # Also invalidates the in-process caches of all workers
+        backend.delete_many(*keys)
+    elif isinstance(backend, RedisCache):
+        prefix = backend._get_prefix()
+        pipe = backend._write_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.delete(f"{prefix}{key}")
+        pipe.execute()
+    else:
+        # delete_many() stops at the first missing key on other backends
+        for key in keys:
+            cache.delete(key)
+
+    logging.debug(f"Evicted {len(keys)} cached views")
+
+
 def cache_filler():
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             if is_cache_filler():
-                logging.debug(f"Forcing cache miss for {request.path}")
-                cache.delete(f"view/{request.path}")
+                logging.debug(f"Forcing cache miss for {request.full_path}")
+                flags = request_flags(getattr(f, "cache_query_params", ()))
+                cache.delete(view_key(request.path, flags))
             return f(*args, **kwargs)
 
         return decorated_function
 
     return decorator
+
+
+def spawn(fn):
+    """Run `fn` in a background thread."""
+    thread = threading.Thread(target=fn, daemon=True)
+    thread.start()
+    return thread
+
+
+def content_hash(body):
+    """Return a hash of the body that is stable across recomputations."""
+    return hashlib.sha256(RENDER_STATS_RE.sub(b"", body)).hexdigest()
+
+
+def encode_view(response):
+    """Return the cache record for a response.
+
+    The record holds the status, the headers shared by all representations, the
+    body in every content encoding worth serving and the content hash.
+    """
+    body = response.get_data()
+    bodies = {"identity": body}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        for encoding, compressed in (
+            ("br", brotli.compress(body, quality=BROTLI_QUALITY)),
+            ("gzip", gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)),
+        ):
+            if len(compressed) < len(body):
+                bodies[encoding] = compressed
+
+    return {
+        "status": response.status_code,
+        "headers": [
+            (name, value)
+            for name, value in response.headers.items()
+            if name.lower() not in REPRESENTATION_HEADERS
+        ],
+        "bodies": bodies,
+        "hash": content_hash(body),
+    }
+
+
+def tee_view(response, key, timeout=None):
+    """Pass a streamed response through and cache it once it is complete.
+
+    Nothing is cached if the client goes away before the end of the stream.
+    """
+    source = response.response
+    chunks = []
+
+    def generate():
+        for chunk in source:
+            chunks.append(chunk.encode() if isinstance(chunk, str) else chunk)
+            yield chunk
+
+        complete = current_app.response_class(
+            b"".join(chunks), status=response.status_code, headers=response.headers
+        )
+        store_view(key, encode_view(complete), timeout=timeout)
+
+    response.response = stream_with_context(generate())
+    return response
+
+
+def serve_view(record):
+    """Build the response for a cache record.
+
+    Chooses the best encoding the client accepts and answers with 304 Not
+    Modified if the client sent a matching `If-None-Match` header.
+    """
+    bodies = record["bodies"]
+    encoding = request.accept_encodings.best_match(
+        [encoding for encoding in ("br", "gzip") if encoding in bodies]
+    )
+    if encoding is None:
+        encoding = "identity"
+
+    etag = record["hash"] if encoding == "identity" else f"{record['hash']}-{encoding}"
+
+    response = current_app.response_class(status=record["status"], headers=record["headers"])
+    response.vary.add("Accept-Encoding")
+    response.set_etag(etag)
+
+    if request.if_none_match.contains(etag):
+        response.status_code = 304
+        return response
+
+    response.set_data(bodies[encoding])
+    if encoding != "identity":
+        response.content_encoding = encoding
+    return response
+
+
+def store_view(key, record, timeout=None):
+    """Cache a view's record until its soft timeout plus the stale period."""
+    config = current_app.config
+    if timeout is None:
+        timeout = config.get("CACHE_DEFAULT_TIMEOUT", 300)
+
+    jitter = config.get("CACHE_TIMEOUT_JITTER", 0.0)
+    soft_timeout = timeout * (1 - random.uniform(0, jitter))
+    hard_timeout = math.ceil(soft_timeout) + config.get("CACHE_STALE_TIMEOUT", 0)
+
+    record["fresh_until"] = time.time() + soft_timeout
+    cache.set(key, record, timeout=hard_timeout)
+
+
+def refresh_view(key, flags=()):
+    """Recompute a stale view in the background, unless another worker is."""
+    config = current_app.config
+    lock_key = f"lock/{key}"
+    if not cache.add(lock_key, 1, timeout=config.get("CACHE_REFRESH_LOCK_TIMEOUT", 60)):
+        return
+
+    app = current_app._get_current_object()
+    path = request.path
+    query_string = variant_query(flags)
+
+    def refresh():
+        try:
+            with app.test_request_context(
+                path,
+                query_string=query_string,
+                environ_overrides={REFRESH_ENVIRON_KEY: True},
+            ):
+                app.full_dispatch_request()
+        finally:
+            with app.app_context():
+                cache.delete(lock_key)
+
+    logging.debug(f"Refreshing stale view {path}")
+    spawn(refresh)
+
+
+def cached_view(timeout=None, query_params=(), fields=False):
+    """Decorator to cache a view's response, keyed by its request path.
+
+    :param timeout: seconds until the response is stale, defaults to
+                    `CACHE_DEFAULT_TIMEOUT`
+    :param query_params: flag parameters that change the response, each
+                         combination of them is cached separately. Parameters
+                         changing it only with a certain value are given as
+                         `name=value`. All other query parameters are ignored.
+    :param fields: whether the view accepts `fields[<type>]` parameters
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            flags = request_flags(query_params)
+            fieldset = FieldSet.from_args(request.args) if fields else None
+            if fieldset:
+                flags += fieldset.query_params()
+                key = fields_variant_key(view_key(request.path, flags))
+            else:
+                key = view_key(request.path, flags)
+
+            if not request.environ.get(REFRESH_ENVIRON_KEY):
+                record = cache.get(key)
+                if isinstance(record, dict):
+                    if record["fresh_until"] < time.time():
+                        refresh_view(key, flags)
+                    return serve_view(record)
+
+            response = make_response(f(*args, **kwargs))
+            if response.direct_passthrough:
+                return response
+            if response.is_streamed:
+                return tee_view(response, key, timeout)
+
+            record = encode_view(response)
+            store_view(key, record, timeout=timeout)
+            return serve_view(record)
+
+        decorated_function.cache_query_params = tuple(query_params)
+        return decorated_function
+
+    return decorator
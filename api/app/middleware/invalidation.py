@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""Middleware to evict exactly those cached views affected by a commit.
+
+Admin writes change which tags are attached to a thesis or remove tags
+altogether. Before each flush the pending changes are collected from the
+session and resolved into the set of view paths that embed the changed
+objects. Once the transaction commits, these views are evicted in one batch.
+"""
+
+from config import API_ROOT
+from middleware.cache import evict_views
+from models import Tag, Thesis
+from services.logger import logger
+from sqlalchemy import event, inspect
+
+SESSION_KEY = "view_invalidations"
+
+# Views listing all tags or their thesis counts
+LIST_VIEWS = ("/base", "/tags/", "/tags.json")
+
+
+def affected_views(changed_tags=(), member_tags=(), changed_theses=()):
+    """Return the view paths that need to be evicted after a change.
+
+    :param changed_tags: tags which were created, deleted or edited
+    :param member_tags: tags which were added to or removed from a thesis
+    :param changed_theses: theses whose list of tags has changed
+    """
+    # Every tag whose related tags, thesis list or thesis count changed
+    touched_tags = set(changed_tags) | set(member_tags)
+    for thesis in changed_theses:
+        touched_tags.update(thesis.tags)
+
+    tag_pages = set(touched_tags)
+    for tag in touched_tags:
+        for thesis in tag.theses:
+            tag_pages.update(thesis.tags)
+
+    # Theses embedding a changed tag or a thesis with changed tags, and theses
+    # listing one of those in their related theses
+    embedding_theses = set(changed_theses)
+    for tag in changed_tags:
+        embedding_theses.update(tag.theses)
+
+    thesis_pages = set(changed_theses)
+    for tag in touched_tags:
+        thesis_pages.update(tag.theses)
+    for thesis in embedding_theses:
+        for tag in thesis.tags:
+            thesis_pages.update(tag.theses)
+
+    rv = {f"{API_ROOT}{path}" for path in LIST_VIEWS}
+    rv.update(f"{API_ROOT}/tags/{tag.slug}" for tag in tag_pages)
+    rv.update(f"{API_ROOT}/thesis/{thesis.id}" for thesis in thesis_pages)
+    for thesis in embedding_theses:
+        # Foreign keys of pending theses are only populated on flush
+        election_id = (
+            thesis.election_id if thesis.election_id is not None else thesis.election.id
+        )
+        rv.add(f"{API_ROOT}/elections/{election_id}")
+    return rv
+
+
+def collect_changes(session, flush_context, instances):
+    """Record view paths affected by the pending changes in this session."""
+    changed_tags = set()
+    member_tags = set()
+    changed_theses = set()
+
+    for obj in session.deleted:
+        if isinstance(obj, Tag):
+            changed_tags.add(obj)
+
+    for obj in session.new:
+        if isinstance(obj, Tag):
+            changed_tags.add(obj)
+
+    for obj in session.dirty:
+        if isinstance(obj, Tag) and session.is_modified(
+            obj, include_collections=False
+        ):
+            changed_tags.add(obj)
+        elif isinstance(obj, Thesis):
+            history = inspect(obj).attrs.tags.history
+            if history.added or history.deleted:
+                changed_theses.add(obj)
+                member_tags.update(history.added)
+                member_tags.update(history.deleted)
+
+    if changed_tags or member_tags or changed_theses:
+        paths = affected_views(changed_tags, member_tags, changed_theses)
+        session.info.setdefault(SESSION_KEY, set()).update(paths)
+
+
+def evict_affected(session):
+    """Evict all views recorded for the transaction that just committed."""
+    paths = session.info.pop(SESSION_KEY, None)
+    if paths:
+        logger.info(f"Evicting {len(paths)} cached views")
+        evict_views(paths)
+
+
+def discard_affected(session, *args):
+    session.info.pop(SESSION_KEY, None)
+
+
+def track_view_dependencies(session):
+    """Register the invalidation hooks on a (scoped) SQLAlchemy session."""
+    if event.contains(session, "before_flush", collect_changes):
+        return
+
+    event.listen(session, "before_flush", collect_changes)
+    event.listen(session, "after_commit", evict_affected)
+    event.listen(session, "after_soft_rollback", discard_affected)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""JSON provider serializing responses with orjson.
+
+Produces the same bytes as Flask's default provider built on the standard
+library: compact, with sorted keys and non-ASCII characters escaped. orjson
+writes UTF-8 and some exponents differently, which is corrected or, where
+that is not possible, handled by falling back to the standard library:
+
+- non-ASCII characters and DEL are escaped afterwards
+- floats with single digit exponents, written `1e-7` instead of `1e-07`
+- dicts with keys other than strings, which the standard library sorts
+  before converting them to strings
+- anything else orjson cannot serialize, like integers beyond 64 bit
+
+NaN and infinite floats are written as `null` instead of the invalid JSON
+tokens the standard library emits.
+"""
+
+import re
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+COMPACT_SEPARATORS = (",", ":")
+
+# Characters the standard library escapes with ensure_ascii, apart from those
+# orjson escapes already
+NON_ASCII_RE = re.compile("[\x7f-\U0010ffff]")
+
+# Floats orjson writes with a single digit exponent
+SHORT_EXPONENT_RE = re.compile(rb"\de[+-]\d(?!\d)")
+
+
+def escape_char(match):
+    code = ord(match.group())
+    if code > 0xFFFF:
+        code -= 0x10000
+        return f"\\u{0xD800 | (code >> 10):04x}\\u{0xDC00 | (code & 0x3FF):04x}"
+    return f"\\u{code:04x}"
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider using orjson for compact output."""
+
+    def dumps_bytes(self, obj):
+        """Return compact JSON for `obj` as bytes."""
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+
+        try:
+            rv = orjson.dumps(obj, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            rv = None
+
+        if rv is None or SHORT_EXPONENT_RE.search(rv):
+            return super().dumps(obj, separators=COMPACT_SEPARATORS).encode()
+
+        if self.ensure_ascii and (not rv.isascii() or b"\x7f" in rv):
+            rv = NON_ASCII_RE.sub(escape_char, rv.decode()).encode()
+        return rv
+
+    def dumps(self, obj, **kwargs):
+        if kwargs == {"separators": COMPACT_SEPARATORS}:
+            return self.dumps_bytes(obj).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype
+        )
@@ -2,23 +2,89 @@
 """Middleware for providing JSON encoded responses."""
 
 import config
-from flask import g, jsonify
+from flask import current_app, g, jsonify, request, stream_with_context
+from middleware.json_provider import COMPACT_SEPARATORS
+from middleware.query_stats import query_stats
 
+NORMALIZED_FORMAT = "format=normalized"
 
-def json_response(data, filename=None, status=200):
-    data["meta"] = {
+# Bytes of a streamed response collected before they are sent
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def normalized_tags():
+    """Return a dict collecting the tags of a normalized response.
+
+    With `?format=normalized`, theses reference their tags by slug and the
+    response lists each tag once in a top-level `tags` dict. Returns None
+    for the default format, in which tags are embedded.
+    """
+    return {} if request.args.get("format") == "normalized" else None
+
+
+def response_meta():
+    meta = {
         "api": config.API_FULL_NAME,
         "render_time": g.request_time(),
         "license": "Please see https://github.com/ciex/metawahl/master/LICENSE \
 for licensing information",
     }
 
+    stats = query_stats()
+    if stats is not None:
+        meta["queries"] = stats.to_dict()
+
+    return meta
+
+
+def set_download_headers(response, filename):
+    response.headers["Content-Type"] = "text/json"
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+
+
+def json_response(data, filename=None, status=200):
+    data["meta"] = response_meta()
+
     rv = jsonify(data)
     rv.cache_control.max_age = 300
     rv.status_code = status
 
     if filename is not None:
-        rv.headers["Content-Type"] = "text/json"
-        rv.headers["Content-Disposition"] = f"attachment; filename={filename}"
+        set_download_headers(rv, filename)
+
+    return rv
+
+
+def json_stream_response(items, filename=None):
+    """Respond with a JSON object whose `data` array is written item by item.
+
+    The items are serialized as they are produced, so only one chunk of the
+    response is held in memory at a time. The `meta` block comes last, which
+    keeps the keys sorted and lets it include all queries of the request.
+
+    :param items: iterable of the JSON serializable items of the array
+    """
+    app = current_app._get_current_object()
+
+    def dumps(obj):
+        return app.json.dumps(obj, separators=COMPACT_SEPARATORS).encode()
+
+    def generate():
+        buffer = bytearray(b'{"data":[')
+        for n, item in enumerate(items):
+            if n > 0:
+                buffer += b","
+            buffer += dumps(item)
+            if len(buffer) >= STREAM_CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += b'],"meta":' + dumps(response_meta()) + b"}\n"
+        yield bytes(buffer)
+
+    rv = app.response_class(stream_with_context(generate()), mimetype=app.json.mimetype)
+    rv.cache_control.max_age = 300
+
+    if filename is not None:
+        set_download_headers(rv, filename)
 
     return rv
@@ -4,7 +4,9 @@
 import time
 from pprint import pformat
 
-from flask import g, request
+from flask import current_app, g, request
+from middleware.query_stats import query_stats, start_query_stats
+from services.db_pool import metrics
 from services.logger import logger
 
 
@@ -19,18 +21,25 @@ def before_request():
     # https://gist.github.com/lost-theory/4521102
     g.request_start_time = time.time()
     g.request_time = lambda: "%.5fs" % (time.time() - g.request_start_time)
+    start_query_stats()
 
 
 def after_request(response):
     # This IF avoids the duplication of registry in the log,
     # since that 500 is already logged via @app.errorhandler.
     if response.status_code != 500:
+        stats = query_stats()
         logger.debug(
-            "%s %s %s %s %s",
+            "%s %s %s %s %s %d queries in %.5fs",
             request.remote_addr,
             request.method,
             request.scheme,
             request.full_path,
             response.status,
+            stats.count if stats else 0,
+            stats.duration if stats else 0,
         )
+        if stats is not None and stats.slowest is not None:
+            logger.debug("Slowest query (%.5fs): %s", stats.slowest_duration, stats.slowest)
+    metrics.log(current_app.config.get("DB_POOL_METRICS_INTERVAL"))
     return response
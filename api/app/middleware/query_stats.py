@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""Per-request statistics of the SQL statements run by a view.
+
+Engine events count the statements of the current request and sum up the time
+spent waiting for the database. The numbers are included in the `meta` block
+of JSON responses and in the access log, together with the slowest statement.
+
+Views can declare a query budget with `query_budget`. A request running more
+statements than its view's budget raises `QueryBudgetExceeded` if
+`QUERY_BUDGET_STRICT` is set, which it is by default when testing, and logs a
+warning otherwise.
+"""
+
+import time
+
+from flask import current_app, g, has_request_context, request
+from services.logger import logger
+from sqlalchemy import event
+
+TIMER_KEY = "query_stats_start"
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    """Number and duration of the statements run during a request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = None
+        self.slowest_duration = 0.0
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        if self.slowest is None or duration > self.slowest_duration:
+            self.slowest = statement
+            self.slowest_duration = duration
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "time": f"{self.duration:.5f}s",
+            "slowest": f"{self.slowest_duration:.5f}s",
+        }
+
+
+def start_query_stats():
+    g.query_stats = QueryStats()
+
+
+def query_stats():
+    """Return the stats of the current request, None outside of requests."""
+    if not has_request_context():
+        return None
+    return g.get("query_stats")
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if query_stats() is not None:
+        conn.info.setdefault(TIMER_KEY, []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = query_stats()
+    timers = conn.info.get(TIMER_KEY)
+    if stats is not None and timers:
+        stats.record(statement, time.perf_counter() - timers.pop())
+
+
+def track_queries(engine):
+    """Register the hooks recording query stats on an engine."""
+    if event.contains(engine, "before_cursor_execute", before_cursor_execute):
+        return
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def query_budget(max_queries):
+    """Decorator declaring the most statements a view may run per request."""
+
+    def decorator(f):
+        f.query_budget = max_queries
+        return f
+
+    return decorator
+
+
+def check_query_budget(response):
+    stats = query_stats()
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, "query_budget", None)
+    if stats is None or budget is None or stats.count <= budget:
+        return response
+
+    msg = (
+        f"{request.full_path} ran {stats.count} queries, "
+        f"its budget is {budget}. Slowest:\n{stats.slowest}"
+    )
+    if current_app.config.get("QUERY_BUDGET_STRICT", current_app.testing):
+        raise QueryBudgetExceeded(msg)
+    logger.warning(msg)
+    return response
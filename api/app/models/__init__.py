@@ -6,6 +6,8 @@ def dt_string(dt):
     return dt.strftime("%Y-%m-%d %H:%M:%S Z")
 
 from .election import Election
+from .fields import FieldSet
+from .loading import loader_profile
 from .party import Party
 from .position import Position
 from .quiz_answer import QuizAnswer
@@ -8,6 +8,7 @@ from sqlalchemy import Boolean, DateTime, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from . import dt_string
+from .fields import ALL_FIELDS
 
 if TYPE_CHECKING:
     from .result import Result
@@ -27,37 +28,40 @@ class Election(db.Model):
     preliminary: Mapped[bool | None] = mapped_column(Boolean, default=False)
 
     theses: Mapped[list["Thesis"]] = relationship(back_populates="election")
-    results: Mapped[list["Result"]] = relationship(back_populates="election", lazy="joined")
+    results: Mapped[list["Result"]] = relationship(back_populates="election")
 
     def __repr__(self):
         prelim = " (preliminary)" if self.preliminary else ""
         return f"<Election {self.id}: {self.title}{prelim}>"
 
-    def to_dict(self, thesis_data=False):
+    def to_dict(self, thesis_data=False, fields=ALL_FIELDS):
         rv = {
             "id": self.id,
             "date": dt_string(self.date),
-            "results": self.result_dict(),
             "source": self.source,
-            "results_source": {"url": self.results[0].source_url},
             "territory": self.territory,
             "title": self.title,
             "wikidata_id": self.wikidata_id,
             "wikipedia_title": self.wikipedia_title,
         }
 
-        if self.results[0].source_name is not None:
-            rv["results_source"]["name"] = self.results[0].source_name
+        if fields.wants("election", "results"):
+            rv["results"] = self.result_dict()
+
+        if fields.wants("election", "results_source"):
+            rv["results_source"] = {"url": self.results[0].source_url}
+            if self.results[0].source_name is not None:
+                rv["results_source"]["name"] = self.results[0].source_name
 
         if self.preliminary:
             rv["preliminary"] = True
 
-        if thesis_data:
+        if thesis_data and fields.wants("election", "theses"):
             rv["theses"] = dict()
             for thesis in self.theses:
                 rv["theses"][thesis.id] = thesis.text
 
-        return rv
+        return fields.select("election", rv)
 
     def result_dict(self):
         rv = dict()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""Sparse fieldsets for serializing models.
+
+Clients can restrict the fields of each type of object in a response with
+parameters like `?fields[thesis]=id,title&fields[tag]=title`. Relationships
+backing fields that were not requested are neither loaded nor serialized.
+
+Unknown types and field names are ignored, so that every fieldset has a
+canonical form among a limited number of them. The identifying field of each
+type is always included.
+"""
+
+import re
+
+FIELDS_PARAM_RE = re.compile(r"^fields\[(\w+)\]$")
+
+# Serialized fields by type, which is the table name of the model
+FIELDS = {
+    "election": {
+        "date", "id", "preliminary", "results", "results_source", "source",
+        "territory", "theses", "title", "wikidata_id", "wikipedia_title",
+    },
+    "position": {"party", "text", "value"},
+    "tag": {
+        "aliases", "description", "image", "labels", "related_tags", "root", "slug",
+        "theses", "thesis_count", "title", "url", "wikidata_id", "wikipedia_title",
+    },
+    "thesis": {"election_id", "id", "positions", "tags", "text", "title"},
+}
+
+IDENTIFYING_FIELDS = {"election": "id", "position": "party", "tag": "slug", "thesis": "id"}
+
+
+class FieldSet:
+    """Fields to serialize by type. Types without an entry have all fields."""
+
+    def __init__(self, fields=None):
+        self.fields = fields or {}
+
+    @classmethod
+    def from_args(cls, args):
+        """Parse the `fields[<type>]` parameters of a request's query args."""
+        fields = {}
+        for param, value in args.items():
+            match = FIELDS_PARAM_RE.match(param)
+            if match is None or match.group(1) not in FIELDS:
+                continue
+
+            type = match.group(1)
+            names = {name for name in value.split(",") if name in FIELDS[type]}
+            fields[type] = frozenset(names | {IDENTIFYING_FIELDS[type]})
+        return cls(fields)
+
+    def __bool__(self):
+        return len(self.fields) > 0
+
+    def wants(self, type, name):
+        only = self.fields.get(type)
+        return only is None or name in only
+
+    def select(self, type, rv):
+        """Return the requested fields of a dict serializing an object."""
+        only = self.fields.get(type)
+        if only is None:
+            return rv
+        return {name: value for name, value in rv.items() if name in only}
+
+    def query_params(self):
+        """Return the fieldset as canonical `fields[<type>]=...` parameters."""
+        return [
+            f"fields[{type}]={','.join(sorted(self.fields[type]))}"
+            for type in sorted(self.fields)
+        ]
+
+
+ALL_FIELDS = FieldSet()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""Eager loading profiles for the views of the API.
+
+Relationships are loaded lazily by default. Each view instead loads everything
+it serializes up front by applying a named profile of loader options to its
+query, so that the number of queries it runs does not depend on the number
+of theses, tags or results involved.
+
+Relationships backing a serialized field are left out of a profile if a
+sparse fieldset excludes that field.
+"""
+
+from functools import cache
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from .election import Election
+from .fields import ALL_FIELDS
+from .tag import Tag
+from .thesis import Thesis
+
+
+class Load:
+    """Eager load of a relationship and the relationships below it.
+
+    :param fields: fields of the parent object that need the relationship.
+                   Without these, the relationship is always loaded.
+    """
+
+    def __init__(self, attr, *children, fields=None):
+        self.attr = attr
+        self.children = children
+        self.fields = fields
+
+    def option(self, fieldset):
+        """Return the loader option, None if no requested field needs it."""
+        type = self.attr.class_.__tablename__
+        if self.fields is not None and not any(
+            fieldset.wants(type, name) for name in self.fields
+        ):
+            return None
+
+        # Join many-to-one relationships, select collections in one query
+        loader = selectinload if self.attr.property.uselist else joinedload
+        rv = loader(self.attr)
+        children = [child.option(fieldset) for child in self.children]
+        children = [child for child in children if child is not None]
+        return rv.options(*children) if children else rv
+
+
+@cache
+def _profiles():
+    # Created on first use, as loader options can only be built once all
+    # models are mapped
+
+    results = Load(Election.results, fields=("results", "results_source"))
+    thesis_fields = (
+        Load(Thesis.tags, fields=("tags",)),
+        Load(Thesis.positions, fields=("positions",)),
+    )
+
+    return {
+        # Elections as listed on the base and election list views
+        "election_list": (results,),
+        "election_list_with_theses": (results, Load(Election.theses, fields=("theses",))),
+        # Election with its theses
+        "election_page": (results, Load(Election.theses, *thesis_fields)),
+        # Tags with the ids of their theses
+        "tag_list_with_theses": (Load(Tag.theses, fields=("theses",)),),
+        # Tag with its theses and the elections of those
+        "tag_page": (
+            Load(Tag.theses, *thesis_fields, Load(Thesis.election, results)),
+        ),
+        # Theses as serialized by their to_dict()
+        "thesis_list": thesis_fields,
+    }
+
+
+def _options(name, fields):
+    options = [load.option(fields) for load in _profiles()[name]]
+    return tuple(option for option in options if option is not None)
+
+
+@cache
+def _all_field_options(name):
+    return _options(name, ALL_FIELDS)
+
+
+def loader_profile(name, fields=ALL_FIELDS):
+    """Return the loader options of a profile for use in `Query.options()`.
+
+    :param fields: `FieldSet` of the fields to be serialized
+    """
+    if not fields:
+        return _all_field_options(name)
+    return _options(name, fields)
@@ -6,6 +6,8 @@ from services import db
 from sqlalchemy import ForeignKey, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from .fields import ALL_FIELDS
+
 if TYPE_CHECKING:
     from .party import Party
     from .thesis import Thesis
@@ -24,17 +26,17 @@ class Position(db.Model):
     party: Mapped["Party"] = relationship(back_populates="positions")
 
     thesis_id: Mapped[str] = mapped_column(
-        String(10), ForeignKey("thesis.id"), nullable=False
+        String(10), ForeignKey("thesis.id"), nullable=False, index=True
     )
     thesis: Mapped["Thesis"] = relationship(back_populates="positions")
 
     def __repr__(self):
         return f"<Position {self.thesis_id}/{self.party_name}: {self.value}>"
 
-    def to_dict(self):
+    def to_dict(self, fields=ALL_FIELDS):
         rv = {"value": self.value, "party": self.party_name}
 
         if self.text is not None:
             rv["text"] = self.text
 
-        return rv
+        return fields.select("position", rv)
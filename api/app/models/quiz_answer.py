@@ -4,7 +4,7 @@ import datetime
 from typing import TYPE_CHECKING
 
 from services import db
-from sqlalchemy import DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from . import dt_string
@@ -28,7 +28,16 @@ class QuizAnswer(db.Model):
     )
     thesis: Mapped["Thesis"] = relationship(back_populates="quiz_answers")
 
-    __table_args__ = (UniqueConstraint("uuid", "thesis_id", name="u_quizanswer"),)
+    __table_args__ = (
+        UniqueConstraint("uuid", "thesis_id", name="u_quizanswer"),
+        # Covers counting answers per thesis
+        Index(
+            "ix_quiz_answer_thesis_id_answer",
+            "thesis_id",
+            "answer",
+            postgresql_include=["id"],
+        ),
+    )
 
     def __repr__(self):
         return f"<QuizAnswer {self.thesis_id} / {self.answer}>"
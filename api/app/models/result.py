@@ -33,6 +33,6 @@ class Result(db.Model):
     party: Mapped["Party"] = relationship(back_populates="results")
 
     election_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("election.id"), nullable=False
+        Integer, ForeignKey("election.id"), nullable=False, index=True
     )
     election: Mapped["Election"] = relationship(back_populates="results")
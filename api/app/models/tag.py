@@ -1,13 +1,14 @@
 #!/usr/bin/env python
 
-from collections import defaultdict
 from typing import TYPE_CHECKING
 
 from services import db
 from slugify import slugify
-from sqlalchemy import Column, ForeignKey, String, Table, Text
+from sqlalchemy import Column, ForeignKey, Index, String, Table, Text, select
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from .fields import ALL_FIELDS
+
 if TYPE_CHECKING:
     from .thesis import Thesis
 
@@ -16,6 +17,8 @@ tags = Table(
     db.metadata,
     Column("tag_title", String(128), ForeignKey("tag.title"), primary_key=True),
     Column("thesis_id", String(10), ForeignKey("thesis.id"), primary_key=True),
+    # The primary key leads with tag_title, this covers lookups by thesis
+    Index("ix_tags_thesis_id_tag_title", "thesis_id", "tag_title"),
 )
 
 
@@ -28,7 +31,7 @@ class Tag(db.Model):
     title: Mapped[str] = mapped_column(String(128), primary_key=True)
     slug: Mapped[str] = mapped_column(String(128), unique=True, nullable=False)
     url: Mapped[str | None] = mapped_column(Text)
-    wikidata_id: Mapped[str | None] = mapped_column(String(16))
+    wikidata_id: Mapped[str | None] = mapped_column(String(16), index=True)
     wikipedia_title: Mapped[str | None] = mapped_column(String(256))
     image: Mapped[str | None] = mapped_column(String(255))
 
@@ -50,6 +53,8 @@ class Tag(db.Model):
         include_theses_ids=False,
         include_related_tags=None,
         query_root_status=False,
+        tag_index=None,
+        fields=ALL_FIELDS,
     ):
         rv = {
             "title": self.title,
@@ -76,18 +81,18 @@ class Tag(db.Model):
         if thesis_count is not None:
             rv["thesis_count"] = thesis_count
 
-        if include_theses_ids:
+        if include_theses_ids and fields.wants("tag", "theses"):
             rv["theses"] = [thesis.id for thesis in self.theses]
 
-        if include_related_tags is not None:
-            rv["related_tags"] = self.related_tags(include_related_tags)
+        if include_related_tags is not None and fields.wants("tag", "related_tags"):
+            rv["related_tags"] = self.related_tags(include_related_tags, tag_index, fields)
 
-        if query_root_status:
+        if query_root_status and fields.wants("tag", "root"):
             rv["root"] = self.is_root
 
-        return rv
+        return fields.select("tag", rv)
 
-    def related_tags(self, format):
+    def related_tags(self, format, tag_index=None, fields=ALL_FIELDS):
         """Return a dictionary of related tags.
 
         The return value distinguishes between parent tags, which are present
@@ -96,19 +101,18 @@ class Tag(db.Model):
         that are present on this tag's theses.
 
         The number of returned tags in the 'linked' category is limited to ~15.
+
+        If a `tag_index` dict is given, full tags are added to it by slug and
+        only referenced by their slug in the return value.
         """
 
+        from .tag_graph import tag_graph
+
         if format not in ["simple", "full"]:
             format = "simple"
 
-        tag_counts = defaultdict(int)
-        tags_map = dict()
-
-        for thesis in self.theses:
-            for tag in thesis.tags:
-                if tag != self:
-                    tag_counts[tag.title] += 1
-                    tags_map[tag.title] = tag
+        graph = tag_graph()
+        tag_counts = graph.related(self.title)
 
         num_related_tags = 15
         try:
@@ -120,29 +124,45 @@ class Tag(db.Model):
         else:
             rv = {"parents": {}, "linked": {}}
 
-            self_theses_count = len(self.theses)
-
-            for tag in tag_counts.keys():
-                if tag_counts[tag] >= cutoff:
-                    if (
-                        tag_counts[tag] >= (0.8 * self_theses_count)
-                        and len(tags_map[tag].theses) >= self_theses_count
-                    ):
-                        relation = "parents"
-                    else:
-                        relation = "linked"
-
-                    if format == "full":
-                        related_tag = tags_map[tag].to_dict()
-                    else:
-                        related_tag = tags_map[tag].slug
-
-                    rv[relation][tag] = {"count": tag_counts[tag], "tag": related_tag}
+            self_theses_count = graph.thesis_count(self.title)
+            related = [tag for tag, count in tag_counts.items() if count >= cutoff]
+
+            if format == "full":
+                tags_map = {
+                    tag.title: tag
+                    for tag in db.session.execute(
+                        select(Tag).where(Tag.title.in_(related))
+                    ).scalars()
+                }
+
+            for tag in related:
+                if (
+                    tag_counts[tag] >= (0.8 * self_theses_count)
+                    and graph.thesis_count(tag) >= self_theses_count
+                ):
+                    relation = "parents"
+                else:
+                    relation = "linked"
+
+                if format == "full" and tag_index is not None:
+                    related_tag = tags_map[tag].index_in(tag_index, fields)
+                elif format == "full":
+                    related_tag = tags_map[tag].to_dict(fields=fields)
+                else:
+                    related_tag = graph.slugs[tag]
+
+                rv[relation][tag] = {"count": tag_counts[tag], "tag": related_tag}
 
             return rv
 
+    def index_in(self, tag_index, fields=ALL_FIELDS):
+        """Add this tag to a dict of tags by slug and return its slug."""
+        if self.slug not in tag_index:
+            tag_index[self.slug] = self.to_dict(fields=fields)
+        return self.slug
+
     @property
     def is_root(self):
         """Return true if this tag has no parent tagas in its related tags."""
         rl = self.related_tags("simple")
-        return len(rl["parents"]) == 0
+        return len(rl.get("parents", {})) == 0
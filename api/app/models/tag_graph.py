@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+"""In-memory tag co-occurrence graph.
+
+Related tags are derived from how often two tags are found on the same thesis.
+Instead of walking the relationships between tags and theses for every tag,
+each worker keeps an index of the `tags` association table: the theses of each
+tag and the number of theses shared by every pair of tags.
+
+The graph is built from the database on first use and whenever the dataset
+version changed. The worker committing a change to thesis tags updates its
+graph incrementally instead.
+
+The graph also holds an index of related theses, computed on first use for all
+theses at once.
+"""
+
+import math
+import threading
+from collections import Counter, defaultdict
+
+from services import db
+from services.dataset_version import bump_version, current_version
+from services.replicas import reading_primary
+from sqlalchemy import event, inspect, select
+
+from .tag import Tag, tags
+from .thesis import Thesis
+
+SESSION_KEY = "tag_graph_changes"
+
+# Theses sharing a tag score 1 / number of theses with that tag. Tags on which
+# the score would not exceed MIN_RELATED_SCORE are not taken into account.
+MIN_RELATED_SCORE = 0.03
+MAX_RELATED_TAG_SIZE = math.ceil(1 / MIN_RELATED_SCORE) - 1
+
+# Related theses are collected in groups of equal score until there are more
+# than this many
+MAX_RELATED_THESES = 10
+
+# Scores are summed as integer multiples of 1 / SCORE_UNIT, so that equal
+# scores compare equal regardless of summation order
+SCORE_UNIT = math.lcm(*range(1, MAX_RELATED_TAG_SIZE + 1))
+
+
+class TagGraph:
+    """Theses per tag and co-occurrence counts of tag pairs.
+
+    Inner sets and counters are replaced instead of modified, so readers in
+    other threads never see them change while iterating.
+    """
+
+    def __init__(self, version=None):
+        self.version = version
+        self.theses = defaultdict(frozenset)
+        self.tags = defaultdict(frozenset)
+        self.pairs = defaultdict(Counter)
+        self.slugs = {}
+        self._related_theses = None
+
+    @classmethod
+    def build(cls, version=None):
+        """Build the graph from the database.
+
+        Reads from the primary, as a replica might not have caught up with the
+        change that set the new dataset version yet.
+        """
+        graph = cls(version)
+        tag_theses = defaultdict(set)
+        thesis_tags = defaultdict(set)
+        with reading_primary(db.session) as session:
+            graph.slugs = dict(session.execute(select(Tag.title, Tag.slug)).all())
+            for tag_title, thesis_id in session.execute(
+                select(tags.c.tag_title, tags.c.thesis_id)
+            ):
+                tag_theses[tag_title].add(thesis_id)
+                thesis_tags[thesis_id].add(tag_title)
+
+        for thesis_id, titles in thesis_tags.items():
+            graph.tags[thesis_id] = frozenset(titles)
+            for tag_title in titles:
+                graph.pairs[tag_title].update(titles - {tag_title})
+
+        for tag_title, thesis_ids in tag_theses.items():
+            graph.theses[tag_title] = frozenset(thesis_ids)
+
+        return graph
+
+    def thesis_count(self, tag_title):
+        return len(self.theses.get(tag_title, ()))
+
+    def related(self, tag_title):
+        """Return the number of shared theses by related tag title."""
+        return self.pairs.get(tag_title, Counter())
+
+    def related_theses(self, thesis_id):
+        """Return the ids of the theses most related to a thesis, best first."""
+        index = self._related_theses
+        if index is None:
+            index = self._related_theses = self._build_related_theses()
+        return index.get(thesis_id, [])
+
+    def _build_related_theses(self):
+        scores = defaultdict(Counter)
+        for thesis_ids in self.theses.values():
+            if not 0 < len(thesis_ids) <= MAX_RELATED_TAG_SIZE:
+                continue
+
+            score = SCORE_UNIT // len(thesis_ids)
+            for thesis_id in thesis_ids:
+                for other in thesis_ids:
+                    if other != thesis_id:
+                        scores[thesis_id][other] += score
+
+        index = {}
+        for thesis_id, related in scores.items():
+            groups = defaultdict(list)
+            for other, score in related.items():
+                groups[score].append(other)
+
+            rv = []
+            for score in sorted(groups, reverse=True):
+                rv.extend(sorted(groups[score], reverse=True))
+                if len(rv) > MAX_RELATED_THESES:
+                    break
+            index[thesis_id] = rv
+        return index
+
+    def add(self, tag_title, thesis_id):
+        if thesis_id in self.theses.get(tag_title, ()):
+            return
+
+        others = self.tags.get(thesis_id, frozenset())
+        for other in others:
+            self._count_pair(tag_title, other, 1)
+
+        self.theses[tag_title] = self.theses[tag_title] | {thesis_id}
+        self.tags[thesis_id] = others | {tag_title}
+        self._related_theses = None
+
+    def remove(self, tag_title, thesis_id):
+        if thesis_id not in self.theses.get(tag_title, ()):
+            return
+
+        others = self.tags[thesis_id] - {tag_title}
+        for other in others:
+            self._count_pair(tag_title, other, -1)
+
+        self.theses[tag_title] = self.theses[tag_title] - {thesis_id}
+        self.tags[thesis_id] = others
+        self._related_theses = None
+
+    def drop_tag(self, tag_title):
+        for thesis_id in self.theses.get(tag_title, ()):
+            self.remove(tag_title, thesis_id)
+        self.theses.pop(tag_title, None)
+        self.pairs.pop(tag_title, None)
+        self.slugs.pop(tag_title, None)
+
+    def _count_pair(self, a, b, delta):
+        for tag_title, other in ((a, b), (b, a)):
+            counts = Counter(self.pairs.get(tag_title, ()))
+            counts[other] += delta
+            if counts[other] <= 0:
+                del counts[other]
+            self.pairs[tag_title] = counts
+
+
+_lock = threading.Lock()
+_graph = None
+
+
+def tag_graph():
+    """Return this worker's tag graph, rebuilding it if the dataset changed."""
+    global _graph
+
+    version = current_version()
+    graph = _graph
+    if graph is not None and graph.version == version:
+        return graph
+
+    with _lock:
+        if _graph is None or _graph.version != version:
+            _graph = TagGraph.build(version)
+        return _graph
+
+
+def collect_changes(session, flush_context, instances):
+    """Record changes to tags and their theses in this session."""
+    changes = []
+
+    for obj in session.deleted:
+        if isinstance(obj, Tag):
+            changes.append(("drop_tag", obj.title))
+        elif isinstance(obj, Thesis):
+            changes.extend(("remove", tag.title, obj.id) for tag in obj.tags)
+
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Tag):
+            state = inspect(obj)
+            if state.attrs.slug.history.added:
+                changes.append(("slug", obj.title, obj.slug))
+            history = state.attrs.theses.history
+            changes.extend(("add", obj.title, thesis.id) for thesis in history.added)
+            changes.extend(("remove", obj.title, thesis.id) for thesis in history.deleted)
+        elif isinstance(obj, Thesis):
+            history = inspect(obj).attrs.tags.history
+            changes.extend(("add", tag.title, obj.id) for tag in history.added)
+            changes.extend(("remove", tag.title, obj.id) for tag in history.deleted)
+
+    if changes:
+        session.info.setdefault(SESSION_KEY, []).extend(changes)
+
+
+def apply_changes(session):
+    """Publish a new dataset version and update this worker's graph."""
+    changes = session.info.pop(SESSION_KEY, None)
+    if not changes:
+        return
+
+    previous, version = bump_version()
+
+    with _lock:
+        graph = _graph
+        if graph is None or graph.version != previous:
+            # Rebuilt with all changes on next use
+            return
+
+        for change in changes:
+            if change[0] == "slug":
+                graph.slugs[change[1]] = change[2]
+            else:
+                getattr(graph, change[0])(*change[1:])
+        graph.version = version
+
+
+def discard_changes(session, *args):
+    session.info.pop(SESSION_KEY, None)
+
+
+def track_tag_changes(session):
+    """Register the hooks keeping the tag graph current on a session."""
+    if event.contains(session, "before_flush", collect_changes):
+        return
+
+    event.listen(session, "before_flush", collect_changes)
+    event.listen(session, "after_commit", apply_changes)
+    event.listen(session, "after_soft_rollback", discard_changes)
@@ -1,13 +1,12 @@
 #!/usr/bin/env python
 
-from collections import defaultdict
-from operator import itemgetter
 from typing import TYPE_CHECKING
 
 from services import db
 from sqlalchemy import ForeignKey, String, Text, func, select
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from .fields import ALL_FIELDS
 from .quiz_answer import QuizAnswer
 from .tag import tags
 
@@ -25,91 +24,99 @@ class Thesis(db.Model):
     text: Mapped[str] = mapped_column(Text, nullable=False)
 
     election_id: Mapped[int] = mapped_column(
-        ForeignKey("election.id"), nullable=False
+        ForeignKey("election.id"), nullable=False, index=True
     )
     election: Mapped["Election"] = relationship(back_populates="theses")
 
-    tags: Mapped[list["Tag"]] = relationship(
-        secondary=tags,
-        back_populates="theses",
-        lazy="joined",
-    )
+    tags: Mapped[list["Tag"]] = relationship(secondary=tags, back_populates="theses")
 
-    positions: Mapped[list["Position"]] = relationship(
-        back_populates="thesis", lazy="joined"
-    )
+    positions: Mapped[list["Position"]] = relationship(back_populates="thesis")
 
     quiz_answers: Mapped[list["QuizAnswer"]] = relationship(back_populates="thesis")
 
     def __repr__(self):
         return f"<Thesis {self.id}>"
 
-    def to_dict(self, include_tags=True):
+    def to_dict(self, include_tags=True, tag_index=None, fields=ALL_FIELDS):
+        """Return a dict of the thesis.
+
+        :param tag_index: if given, tags are added to this dict by slug and
+                          referenced by their slug only
+        :param fields: `FieldSet` of the fields to include
+        """
         rv = {
             "id": self.id,
             "title": self.title,
-            "positions": [position.to_dict() for position in self.positions],
-            "tags": [tag.to_dict() for tag in self.tags],
             "election_id": self.election_id,
         }
 
+        if fields.wants("thesis", "positions"):
+            rv["positions"] = [position.to_dict(fields) for position in self.positions]
+
+        if fields.wants("thesis", "tags") and tag_index is None:
+            rv["tags"] = [tag.to_dict(fields=fields) for tag in self.tags]
+        elif fields.wants("thesis", "tags"):
+            rv["tags"] = [tag.index_in(tag_index, fields) for tag in self.tags]
+
         if self.text is not None:
             rv["text"] = self.text
 
-        return rv
-
-    def related(self):
-        """Return theses with similar tags"""
-
-        # Collect all theses that share a tag with this one
-        # and assign a score based on how big the tag is
-        scores = []
-        for tag in self.tags:
-            score = 1.0 / len(tag.theses)
-            if score > 0.03:
-                for thesis in tag.theses:
-                    if thesis.id != self.id:
-                        scores.append((thesis.id, score))
-
-        scores = sorted(scores, key=itemgetter(0))
-
-        # Reduce the list of scores to yield a score per thesis
-        acc = []
-        prev = (None, 0)
-        for score in scores:
-            if score[0] == prev[0] or prev[0] is None:
-                prev = (score[0], prev[1] + score[1])
-            else:
-                acc.append(prev)
-                prev = score
-
-        # Group results by score
-        acc = sorted(acc, key=itemgetter(1), reverse=True)
-        collect = defaultdict(list)
-        for thesis_id, score in acc:
-            collect[score].append(thesis_id)
-
-        rv = list()
-        for score in sorted(collect.keys(), reverse=True):
-            rv.extend(
-                [
-                    db.session.get(Thesis, tid).to_dict()
-                    for tid in sorted(collect[score], reverse=True)
-                ]
-            )
-            if len(rv) > 10:
-                break
-        return rv
+        return fields.select("thesis", rv)
+
+    def related(self, tag_index=None, fields=ALL_FIELDS):
+        """Return theses with similar tags
+
+        Related theses are looked up in the tag graph and loaded in one query.
+        """
+        from .loading import loader_profile
+        from .tag_graph import tag_graph
+
+        thesis_ids = tag_graph().related_theses(self.id)
+        if len(thesis_ids) == 0:
+            return []
+
+        theses = {
+            thesis.id: thesis
+            for thesis in db.session.execute(
+                select(Thesis)
+                .where(Thesis.id.in_(thesis_ids))
+                .options(*loader_profile("thesis_list", fields))
+            ).scalars()
+        }
+        return [
+            theses[thesis_id].to_dict(tag_index=tag_index, fields=fields)
+            for thesis_id in thesis_ids
+        ]
 
     def quiz_tally(self):
-        base = (
-            select(Thesis.id, func.count(QuizAnswer.id))
-            .join(Thesis.quiz_answers)
-            .where(Thesis.id == self.id)
+        return Thesis.quiz_tallies(thesis_ids=[self.id]).get(self.id, (0, 0))
+
+    @classmethod
+    def quiz_tallies(cls, election_id=None, thesis_ids=None):
+        """Return yes and no counts of quiz answers by thesis id.
+
+        Counts all theses of an election or a given list of theses in a single
+        query. Theses without answers are included with counts of zero.
+        """
+        query = cls.quiz_tallies_query(election_id=election_id, thesis_ids=thesis_ids)
+        return {thesis_id: (yes, no) for thesis_id, yes, no in db.session.execute(query)}
+
+    @classmethod
+    def quiz_tallies_query(cls, election_id=None, thesis_ids=None):
+        """Return the statement counting quiz answers for `quiz_tallies`."""
+        query = (
+            select(
+                Thesis.id,
+                func.count(QuizAnswer.id).filter(QuizAnswer.answer == 1),
+                func.count(QuizAnswer.id).filter(QuizAnswer.answer == -1),
+            )
+            .outerjoin(Thesis.quiz_answers)
             .group_by(Thesis.id)
         )
 
-        y = db.session.execute(base.where(QuizAnswer.answer == 1)).all()
-        n = db.session.execute(base.where(QuizAnswer.answer == -1)).all()
+        if election_id is not None:
+            query = query.where(Thesis.election_id == election_id)
+        if thesis_ids is not None:
+            query = query.where(Thesis.id.in_(thesis_ids))
 
-        return (y[0][1] if len(y) > 0 else 0, n[0][1] if len(n) > 0 else 0)
+        return query
@@ -11,10 +11,52 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 SQLALCHEMY_ECHO = False
 SQLALCHEMY_RECORD_QUERIES = False
 
-CACHE_TYPE = "RedisCache"
+# Read replicas serving GET requests, as a comma separated list of URLs. A
+# replica failing to connect is skipped for DB_REPLICA_RETRY_INTERVAL seconds.
+SQLALCHEMY_REPLICA_URIS = [
+    url for url in os.environ.get("METAWAHL_DB_REPLICA_URLS", "").split(",") if url
+]
+DB_REPLICA_RETRY_INTERVAL = 30
+
+# Connection pool of each worker process: one connection per uwsgi thread,
+# overflowing for background cache refreshes. Set METAWAHL_DB_PGBOUNCER when
+# connecting through PgBouncer in transaction pooling mode, which then does
+# all pooling.
+DB_POOL_SIZE = 2
+DB_MAX_OVERFLOW = 4
+DB_POOL_TIMEOUT = 10
+DB_POOL_RECYCLE = 30 * 60
+DB_POOL_PRE_PING = True
+DB_PGBOUNCER = bool(os.environ.get("METAWAHL_DB_PGBOUNCER"))
+
+# Milliseconds after which statements are cancelled
+DB_STATEMENT_TIMEOUT = 30 * 1000
+
+# Seconds between log entries with pool metrics
+DB_POOL_METRICS_INTERVAL = 60
+
+CACHE_TYPE = "services.tiered_cache.TieredRedisCache"
 CACHE_DEFAULT_TIMEOUT = 24 * 60 * 60
 CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://127.0.0.1:6379/0")
 
+# Serve stale views for another day while one worker refreshes them, and
+# spread expiry of keys filled together over 10% of their timeout
+CACHE_STALE_TIMEOUT = 24 * 60 * 60
+CACHE_TIMEOUT_JITTER = 0.1
+CACHE_REFRESH_LOCK_TIMEOUT = 60
+
+# Per-worker in-process cache in front of Redis
+CACHE_L1_MAX_BYTES = 16 * 1024 * 1024
+CACHE_L1_TIMEOUT = 60
+CACHE_L1_GENERATION_INTERVAL = 1.0
+
+# Seconds between checks for changes to the dataset by other workers, which
+# make in-process indexes like the tag graph rebuild
+DATASET_VERSION_INTERVAL = 1.0
+
+# Live quiz tallies, kept apart from the cache so they survive clearing it
+QUIZ_TALLY_REDIS_URL = os.environ.get("QUIZ_TALLY_REDIS_URL", "redis://127.0.0.1:6379/1")
+
 METAWAHL_API_LOGFILE = os.environ.get(
     "METAWAHL_API_LOGFILE", "/var/log/metawahl/flask.log"
 )
@@ -2,6 +2,7 @@
 
 from flask_caching import Cache
 from flask_sqlalchemy import SQLAlchemy
+from services.replicas import RoutingSession
 from sqlalchemy.orm import DeclarativeBase
 
 
@@ -9,5 +10,5 @@ class Base(DeclarativeBase):
     """SQLAlchemy 2.0 typed declarative base for all Metawahl models."""
 
 
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
 cache = Cache()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""Version of the dataset shared by all workers.
+
+In-process indexes derived from the database are tagged with the dataset
+version they were built from. Every commit changing the data they depend on
+sets a new version in the cache, and workers rebuild their indexes once they
+notice it. Workers read the version at most once per
+`DATASET_VERSION_INTERVAL` seconds.
+
+Versions are nanosecond timestamps rather than a counter, so that a cleared
+cache can never lead back to a version that was already seen.
+"""
+
+import threading
+import time
+
+from flask import current_app
+from services import cache
+
+VERSION_KEY = "dataset-version"
+
+_lock = threading.Lock()
+_version = None
+_checked = None
+
+
+def current_version():
+    """Return the current dataset version, None if it has never been set."""
+    global _version, _checked
+
+    now = time.monotonic()
+    interval = current_app.config.get("DATASET_VERSION_INTERVAL", 0)
+    with _lock:
+        if _checked is not None and now - _checked < interval:
+            return _version
+
+    version = cache.get(VERSION_KEY)
+    with _lock:
+        _version = version
+        _checked = now
+    return version
+
+
+def bump_version():
+    """Set a new dataset version and return it together with the previous one.
+
+    The previous version is as seen by this worker just before the change.
+    """
+    global _version, _checked
+
+    previous = cache.get(VERSION_KEY)
+    version = time.time_ns()
+    cache.set(VERSION_KEY, version, timeout=0)
+
+    with _lock:
+        _version = version
+        _checked = time.monotonic()
+    return previous, version
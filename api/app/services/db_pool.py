@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""Database connection pool configuration and metrics.
+
+The pool of each engine is configured from flat `DB_*` settings:
+
+- `DB_POOL_SIZE`, `DB_MAX_OVERFLOW`, `DB_POOL_TIMEOUT` and `DB_POOL_RECYCLE`
+  size the pool and limit the age of its connections
+- `DB_POOL_PRE_PING` tests connections for liveness on checkout
+- `DB_STATEMENT_TIMEOUT` cancels statements running longer than this many
+  milliseconds
+
+With `DB_PGBOUNCER` set the API expects PgBouncer in transaction pooling mode
+in front of Postgres. Connections are not pooled by the workers then, and the
+statement timeout is set at the start of every transaction instead of for
+the whole connection, as PgBouncer shares server connections between clients
+from one transaction to the next.
+
+Pool metrics are collected per process and logged every
+`DB_POOL_METRICS_INTERVAL` seconds.
+"""
+
+import threading
+import time
+
+import sqlalchemy as sa
+from services.logger import logger
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+class PoolMetrics:
+    """Checkout counts and wait times of the connection pools of a process."""
+
+    def __init__(self):
+        self.pools = []
+        self._lock = threading.Lock()
+        self._logged = time.monotonic()
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.overflows = 0
+        self.timeouts = 0
+
+    def record_checkout(self, wait, overflow=False, timeout=False):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_time += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.overflows += overflow
+            self.timeouts += timeout
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checked_out": sum(pool.checkedout() for pool in self.pools),
+                "checkouts": self.checkouts,
+                "wait_time": self.wait_time,
+                "max_wait": self.max_wait,
+                "overflows": self.overflows,
+                "timeouts": self.timeouts,
+            }
+
+    def log(self, interval):
+        """Log and reset the metrics if `interval` seconds have passed."""
+        now = time.monotonic()
+        if interval is None or now - self._logged < interval:
+            return
+
+        stats = self.snapshot()
+        with self._lock:
+            self._logged = now
+            self.reset()
+        logger.info(
+            "DB pool: {checked_out} checked out, {checkouts} checkouts waiting "
+            "{wait_time:.5f}s (max {max_wait:.5f}s), {overflows} overflows, "
+            "{timeouts} timeouts".format(**stats)
+        )
+
+
+metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """Queue pool recording how long checkouts wait for a connection."""
+
+    def _do_get(self):
+        overflow = max(self.overflow(), 0)
+        start = time.perf_counter()
+        try:
+            rv = super()._do_get()
+        except sa.exc.TimeoutError:
+            metrics.record_checkout(time.perf_counter() - start, timeout=True)
+            raise
+        metrics.record_checkout(
+            time.perf_counter() - start, overflow=self.overflow() > overflow
+        )
+        return rv
+
+
+def engine_options(config):
+    """Return the engine options for the `DB_*` settings in `config`.
+
+    Options set in `SQLALCHEMY_ENGINE_OPTIONS` take precedence.
+    """
+    if config.get("DB_PGBOUNCER"):
+        options = {"poolclass": NullPool}
+    else:
+        options = {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": config.get("DB_POOL_SIZE", 5),
+            "max_overflow": config.get("DB_MAX_OVERFLOW", 10),
+            "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+            "pool_recycle": config.get("DB_POOL_RECYCLE", -1),
+            "pool_pre_ping": config.get("DB_POOL_PRE_PING", False),
+        }
+        timeout = config.get("DB_STATEMENT_TIMEOUT")
+        if timeout:
+            options["connect_args"] = {"options": f"-c statement_timeout={int(timeout)}"}
+
+    options.update(config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    return options
+
+
+def instrument_engine(engine, config):
+    """Collect pool metrics of an engine and apply per-transaction settings."""
+    if isinstance(engine.pool, QueuePool) and engine.pool not in metrics.pools:
+        metrics.pools.append(engine.pool)
+
+    timeout = config.get("DB_STATEMENT_TIMEOUT")
+    if not config.get("DB_PGBOUNCER") or not timeout:
+        return
+
+    def set_statement_timeout(conn):
+        # On the DBAPI cursor, so that it does not count in the query stats
+        cursor = conn.connection.cursor()
+        cursor.execute(f"SET LOCAL statement_timeout = {int(timeout)}")
+        cursor.close()
+
+    event.listen(engine, "begin", set_statement_timeout)
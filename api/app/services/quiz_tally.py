@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""Live tally of quiz answers kept in Redis.
+
+Every election has one Redis hash holding the number of yes and no answers
+for each of its theses, so that a quiz tally is read with a single `HGETALL`.
+Counters are incremented whenever an answer is recorded. A hash is only
+trusted once it has been written completely from the database, which is
+marked by its `complete` field; until then readers fall back to counting
+answers in the database.
+
+Without `QUIZ_TALLY_REDIS_URL` set, tallies are always counted in the database.
+"""
+
+import redis
+from services.logger import logger
+
+COMPLETE_FIELD = "complete"
+ANSWER_FIELDS = {1: "yes", -1: "no"}
+
+
+def tally_key(election_id):
+    return f"quiz-tally/{election_id}"
+
+
+class QuizTally:
+    """Per-thesis counters of quiz answers."""
+
+    def __init__(self, app=None):
+        self.client = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config.get("QUIZ_TALLY_REDIS_URL")
+        self.client = redis.Redis.from_url(url) if url else None
+
+    def increment(self, election_id, thesis_num, answer):
+        """Count an answer that has just been recorded."""
+        if self.client is None or answer not in ANSWER_FIELDS:
+            return
+
+        try:
+            self.client.hincrby(
+                tally_key(election_id), f"{thesis_num}:{ANSWER_FIELDS[answer]}", 1
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Could not count quiz answer: {e}")
+
+    def get(self, election_id):
+        """Return yes and no counts by thesis number for an election.
+
+        Returns None if there is no complete tally for the election in Redis.
+        """
+        if self.client is None:
+            return None
+
+        try:
+            fields = self.client.hgetall(tally_key(election_id))
+        except redis.RedisError as e:
+            logger.warning(f"Could not read quiz tally: {e}")
+            return None
+
+        if COMPLETE_FIELD.encode() not in fields:
+            return None
+
+        rv = {}
+        for field, value in fields.items():
+            if field == COMPLETE_FIELD.encode():
+                continue
+            thesis_num, answer = field.decode().split(":")
+            counts = rv.setdefault(int(thesis_num), [0, 0])
+            counts[0 if answer == "yes" else 1] = int(value)
+        return rv
+
+    def store(self, election_id, tallies):
+        """Replace the tally of an election with counts from the database.
+
+        :param tallies: yes and no counts by thesis number
+        """
+        if self.client is None:
+            return
+
+        mapping = {COMPLETE_FIELD: 1}
+        for thesis_num, (yes, no) in tallies.items():
+            mapping[f"{thesis_num}:yes"] = yes
+            mapping[f"{thesis_num}:no"] = no
+
+        key = tally_key(election_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.hset(key, mapping=mapping)
+        try:
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not store quiz tally: {e}")
+
+
+tally = QuizTally()
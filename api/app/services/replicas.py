@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""Routing of read-only requests to database replicas.
+
+`SQLALCHEMY_REPLICA_URIS` lists read replicas of the primary database. The
+session sends the queries of GET and HEAD requests to these replicas in turn
+and everything else to the primary: writes, queries outside of requests and,
+once a session has written anything, all its remaining queries, so that a
+request always reads its own writes.
+
+A replica failing to connect is skipped for `DB_REPLICA_RETRY_INTERVAL`
+seconds. Reads fall back to the primary while no replica is available.
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from services.logger import logger
+from sqlalchemy import event
+
+PRIMARY_KEY = "use_primary"
+READ_METHODS = ("GET", "HEAD")
+
+
+class ReplicaSet:
+    """Engines of the read replicas, chosen round-robin."""
+
+    def __init__(self, app=None):
+        self.engines = []
+        self.retry_interval = 30
+        self._down_until = {}
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+        self.engines = [
+            sa.create_engine(uri, **options)
+            for uri in app.config.get("SQLALCHEMY_REPLICA_URIS", ())
+        ]
+        self.retry_interval = app.config.get("DB_REPLICA_RETRY_INTERVAL", 30)
+        self._down_until = {}
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._handle_error)
+
+    def choose(self):
+        """Return the next available replica engine, None if there is none."""
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            engine = self.engines[next(self._counter) % len(self.engines)]
+            if self._down_until.get(engine, 0) <= now:
+                return engine
+        return None
+
+    def mark_down(self, engine):
+        with self._lock:
+            self._down_until[engine] = time.monotonic() + self.retry_interval
+        logger.warning(
+            f"Replica {engine.url!r} unavailable, retrying in {self.retry_interval}s"
+        )
+
+    def _handle_error(self, context):
+        # Errors while connecting come without a connection
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(context.engine)
+
+
+replicas = ReplicaSet()
+
+
+def reads_from_replica():
+    return has_request_context() and request.method in READ_METHODS
+
+
+class RoutingSession(Session):
+    """Session reading from a replica during read-only requests."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or engine is not self._db.engines.get(None):
+            return engine
+
+        if self._flushing or isinstance(clause, sa.sql.dml.UpdateBase):
+            self.info[PRIMARY_KEY] = True
+
+        if self.info.get(PRIMARY_KEY) or not reads_from_replica():
+            return engine
+        return replicas.choose() or engine
+
+
+@contextmanager
+def reading_primary(session):
+    """Send the queries of a session to the primary within this context."""
+    previous = session.info.get(PRIMARY_KEY, False)
+    session.info[PRIMARY_KEY] = True
+    try:
+        yield session
+    finally:
+        session.info[PRIMARY_KEY] = previous
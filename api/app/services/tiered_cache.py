@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""Redis cache backend with a per-process LRU cache in front.
+
+Every uwsgi worker keeps the serialized values of recently used keys in a
+bounded in-process cache (L1), so hot views are served without a round trip
+to Redis (L2). Workers stay coherent through a generation counter held in
+Redis: deleting a key increments it, and every worker drops its L1 cache
+when it notices a new generation. Workers check the counter at most once per
+`generation_interval` seconds.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask_caching.backends import RedisCache
+
+GENERATION_KEY = "l1-generation"
+
+
+class TieredRedisCache(RedisCache):
+    """Use a process-local LRU cache in front of Redis.
+
+    :param l1_max_bytes: upper limit for the size of all values in L1
+    :param l1_timeout: maximum number of seconds a value is kept in L1
+    :param l1_key_prefixes: only keys starting with one of these are kept
+                            in L1, others go straight to Redis
+    :param generation_interval: seconds between checks of the generation
+    """
+
+    def __init__(
+        self,
+        *args,
+        l1_max_bytes=16 * 1024 * 1024,
+        l1_timeout=60,
+        l1_key_prefixes=("view/",),
+        generation_interval=1.0,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.l1_max_bytes = l1_max_bytes
+        self.l1_timeout = l1_timeout
+        self.l1_key_prefixes = tuple(l1_key_prefixes)
+        self.generation_interval = generation_interval
+
+        self._l1 = OrderedDict()
+        self._l1_bytes = 0
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked = 0.0
+
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            l1_max_bytes=config.get("CACHE_L1_MAX_BYTES", 16 * 1024 * 1024),
+            l1_timeout=config.get("CACHE_L1_TIMEOUT", 60),
+            generation_interval=config.get("CACHE_L1_GENERATION_INTERVAL", 1.0),
+        )
+        return super().factory(app, config, args, kwargs)
+
+    def _in_l1(self, key):
+        return key.startswith(self.l1_key_prefixes)
+
+    def _clear_l1(self):
+        with self._lock:
+            self._l1.clear()
+            self._l1_bytes = 0
+
+    def _check_generation(self):
+        """Drop L1 if another worker deleted keys since the last check."""
+        now = time.monotonic()
+        if now - self._generation_checked < self.generation_interval:
+            return
+
+        self._generation_checked = now
+        generation = self._read_client.get(f"{self._get_prefix()}{GENERATION_KEY}")
+        if generation != self._generation:
+            self._clear_l1()
+            self._generation = generation
+
+    def _bump_generation(self, pipe):
+        pipe.incr(f"{self._get_prefix()}{GENERATION_KEY}")
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+
+            expires, raw = entry
+            if expires < time.monotonic():
+                del self._l1[key]
+                self._l1_bytes -= len(raw)
+                return None
+
+            self._l1.move_to_end(key)
+            return raw
+
+    def _l1_set(self, key, raw, timeout):
+        if len(raw) > self.l1_max_bytes:
+            return
+
+        if timeout is None or timeout <= 0:
+            timeout = self.l1_timeout
+        expires = time.monotonic() + min(timeout, self.l1_timeout)
+
+        with self._lock:
+            previous = self._l1.pop(key, None)
+            if previous is not None:
+                self._l1_bytes -= len(previous[1])
+
+            self._l1[key] = (expires, raw)
+            self._l1_bytes += len(raw)
+
+            while self._l1_bytes > self.l1_max_bytes:
+                _, (_, evicted) = self._l1.popitem(last=False)
+                self._l1_bytes -= len(evicted)
+
+    def _l1_delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                entry = self._l1.pop(key, None)
+                if entry is not None:
+                    self._l1_bytes -= len(entry[1])
+
+    def get(self, key):
+        if not self._in_l1(key):
+            return super().get(key)
+
+        self._check_generation()
+
+        raw = self._l1_get(key)
+        if raw is not None:
+            self.l1_hits += 1
+        else:
+            raw = self._read_client.get(f"{self._get_prefix()}{key}")
+            if raw is None:
+                self.misses += 1
+                return None
+
+            self.l2_hits += 1
+            self._l1_set(key, raw, self.l1_timeout)
+
+        return self.serializer.loads(raw)
+
+    def set(self, key, value, timeout=None):
+        rv = super().set(key, value, timeout=timeout)
+        if self._in_l1(key):
+            self._l1_set(key, self.serializer.dumps(value), timeout)
+        return rv
+
+    def delete(self, key):
+        return len(self.delete_many(key)) > 0
+
+    def delete_many(self, *keys):
+        """Delete keys and invalidate L1 of all workers in one round trip."""
+        if not keys:
+            return []
+
+        prefix = self._get_prefix()
+        pipe = self._write_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.delete(f"{prefix}{key}")
+
+        l1_keys = [key for key in keys if self._in_l1(key)]
+        if l1_keys:
+            self._bump_generation(pipe)
+
+        results = pipe.execute()
+        self._l1_delete(*l1_keys)
+        deleted = results[: len(keys)]
+        return [key for key, was_deleted in zip(keys, deleted, strict=True) if was_deleted]
+
+    def clear(self):
+        self._clear_l1()
+        rv = super().clear()
+
+        pipe = self._write_client.pipeline(transaction=False)
+        self._bump_generation(pipe)
+        pipe.execute()
+        return rv
+
+    def stats(self):
+        """Return hit counts and ratios for both cache levels."""
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        l2_lookups = self.l2_hits + self.misses
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "l1_hit_ratio": self.l1_hits / lookups if lookups else 0.0,
+            "l2_hit_ratio": self.l2_hits / l2_lookups if l2_lookups else 0.0,
+            "l1_items": len(self._l1),
+            "l1_bytes": self._l1_bytes,
+        }
@@ -0,0 +1,61 @@
+"""hot path indexes
+
+Revision ID: 0002_hot_path_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-18 09:30:00.000000
+
+Secondary indexes for the columns the API filters and joins on. Indexes are
+built concurrently, so the tables stay writable while they are created.
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_hot_path_indexes'
+down_revision: str | Sequence[str] | None = '0001_baseline'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_quiz_answer_thesis_id_answer', 'quiz_answer', ['thesis_id', 'answer'],
+            postgresql_include=['id'], postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_tags_thesis_id_tag_title', 'tags', ['thesis_id', 'tag_title'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_thesis_election_id'), 'thesis', ['election_id'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_position_thesis_id'), 'position', ['thesis_id'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_result_election_id'), 'result', ['election_id'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_tag_wikidata_id'), 'tag', ['wikidata_id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table in (
+            ('ix_tag_wikidata_id', 'tag'),
+            ('ix_result_election_id', 'result'),
+            ('ix_position_thesis_id', 'position'),
+            ('ix_thesis_election_id', 'thesis'),
+            ('ix_tags_thesis_id_tag_title', 'tags'),
+            ('ix_quiz_answer_thesis_id_answer', 'quiz_answer'),
+        ):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
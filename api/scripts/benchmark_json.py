@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Compare JSON serialization with orjson and the standard library
+
+Serializes the payloads of the largest views, as found in the database, with
+the app's orjson provider and with Flask's default provider and prints the
+time each takes. Pass `--repeat N` to set the number of runs per payload.
+
+"""
+import json
+import sys
+import timeit
+
+sys.path.append("./app/")
+
+from flask.json.provider import DefaultJSONProvider
+from main import create_app
+from middleware.json_provider import COMPACT_SEPARATORS
+from models import Tag
+from services import db
+from sqlalchemy import func, select
+
+
+def gen_paths():
+    """Return the paths of the views with the largest payloads."""
+    slugs = db.session.execute(
+        select(Tag.slug).join(Tag.theses).group_by(Tag.slug)
+        .order_by(func.count().desc()).limit(3)
+    ).scalars().all()
+    return ["/v3/base", "/v3/tags.json", *(f"/v3/tags/{slug}" for slug in slugs)]
+
+
+def load_payload(app, path):
+    with app.test_client() as client:
+        return json.loads(client.get(path).data)
+
+
+def benchmark(dumps, payload, repeat):
+    """Return the mean time in seconds `dumps` takes to serialize `payload`."""
+    return timeit.timeit(lambda: dumps(payload), number=repeat) / repeat
+
+
+if __name__ == '__main__':
+    app = create_app()
+    repeat = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 20
+    provider = DefaultJSONProvider(app)
+
+    def stdlib(payload):
+        return provider.dumps(payload, separators=COMPACT_SEPARATORS).encode()
+
+    with app.app_context():
+        paths = gen_paths()
+
+    print(f"{'path':<32}{'size':>10}{'stdlib':>12}{'orjson':>12}{'speedup':>10}")
+    for path in paths:
+        payload = load_payload(app, path)
+        body = app.json.dumps_bytes(payload)
+        assert body == stdlib(payload), f"Output for {path} differs"
+
+        size = len(body)
+        slow = benchmark(stdlib, payload, repeat)
+        fast = benchmark(app.json.dumps_bytes, payload, repeat)
+        print(
+            f"{path:<32}{size:>10}{slow * 1000:>10.2f}ms{fast * 1000:>10.2f}ms"
+            f"{slow / fast:>9.1f}x"
+        )
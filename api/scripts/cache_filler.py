@@ -4,33 +4,47 @@ Metawahl Cache Filler
 
 Request all API pages to fill cache
 
+By default all pages are requested over HTTP. With `--in-process`, views are
+rendered inside the app using a pool of `CACHE_FILLER_WORKERS` threads (or
+processes with `--processes`) and written straight into the view cache.
+
 """
 import logging
 import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit
 
 import requests
 
 sys.path.append("./app/")
 
-from config import API_ROOT, CACHE_FILLER_LOG
+from config import API_ROOT, CACHE_FILLER_LOG, CACHE_FILLER_WORKERS
 from flask import current_app
+from flask_caching.backends import RedisCache
+from middleware.cache import REFRESH_ENVIRON_KEY
 from models import Election, Tag, Thesis
-from services import db
+from services import cache, db
 from services.logger import setup_logger
 from sqlalchemy import select
 
 logger = setup_logger(logfile=CACHE_FILLER_LOG, level=logging.DEBUG)
 
+# App used to render views in worker processes
+worker_app = None
+
 
 def gen_urls():
     """Generate URLs for all cached API URLs."""
 
     urls = []
 
-    def url(endpoint):
+    def url(endpoint, query=None):
         host = "http://localhost:9000" if current_app.config.get('DEBUG', True) \
             else "https://api.metawahl.de"
-        return f"{host}{API_ROOT}{endpoint}?force_cache_miss"
+        query = f"{query}&force_cache_miss" if query else "force_cache_miss"
+        return f"{host}{API_ROOT}{endpoint}?{query}"
 
     # base
 
@@ -38,26 +52,28 @@ def gen_urls():
 
     # elections
 
-    urls.append(url('/elections'))
+    urls.append(url('/elections/'))
+    urls.append(url('/elections/', 'thesis_data=1'))
 
-    elections = db.session.execute(select(Election)).scalars().all()
-    for election in elections:
-        urls.append(url('/elections/{}').format(election.id))
+    election_ids = db.session.execute(select(Election.id)).scalars().all()
+    for election_id in election_ids:
+        urls.append(url('/elections/{}').format(election_id))
 
     # tags
 
     urls.append(url('/tags.json'))
-    urls.append(url('/tags'))
+    urls.append(url('/tags/'))
+    urls.append(url('/tags/', 'include_theses_ids=1'))
 
-    tags = db.session.execute(select(Tag)).scalars().all()
-    for tag in tags:
-        urls.append(url('/tags/{}').format(tag.slug))
+    tag_slugs = db.session.execute(select(Tag.slug)).scalars().all()
+    for tag_slug in tag_slugs:
+        urls.append(url('/tags/{}').format(tag_slug))
 
     # theses
 
-    theses = db.session.execute(select(Thesis)).scalars().all()
-    for thesis in theses:
-        urls.append(url(f'/thesis/{thesis.id}'))
+    thesis_ids = db.session.execute(select(Thesis.id)).scalars().all()
+    for thesis_id in thesis_ids:
+        urls.append(url(f'/thesis/{thesis_id}'))
 
     return urls
 
@@ -70,6 +86,83 @@ def make_requests(urls):
         logger.info(f"{100.0 * i / total:.1f}% - [{resp.status_code}] {resp.elapsed.total_seconds():.2f}\t{int(len(resp.content) / 1024)}k\t{url}")
 
 
+def render_view(app, url):
+    """Render the view for `url` and store it in the view cache.
+
+    The request is marked as a cache refresh, so the view is recomputed and
+    its cache entry overwritten without deleting it first.
+
+    Returns the status code, the time taken and the size of the body.
+    """
+    start = time.perf_counter()
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k != "force_cache_miss"]
+    resp = app.test_client().get(
+        parts.path,
+        query_string=urlencode(query),
+        environ_overrides={REFRESH_ENVIRON_KEY: True},
+    )
+    return resp.status_code, time.perf_counter() - start, len(resp.get_data())
+
+
+def init_worker():
+    global worker_app
+    from main import create_app
+    worker_app = create_app()
+
+
+def render_in_worker(url):
+    return render_view(worker_app, url)
+
+
+def render_views(app, urls, workers=CACHE_FILLER_WORKERS, processes=False):
+    """Render all URLs inside the app using a pool of workers.
+
+    Returns a report with the number of views, total and maximum render time
+    and total body size per endpoint.
+    """
+    adapter = app.url_map.bind("localhost")
+
+    if processes:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+        results = pool.map(render_in_worker, urls, chunksize=16)
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+        results = pool.map(lambda url: render_view(app, url), urls)
+
+    report = defaultdict(lambda: {"views": 0, "errors": 0, "time": 0.0, "max": 0.0, "bytes": 0})
+    total = len(urls)
+    with pool:
+        for i, (url, (status, seconds, size)) in enumerate(zip(urls, results, strict=True)):
+            path = urlsplit(url).path
+            endpoint = adapter.match(path)[0]
+            stats = report[endpoint]
+            stats["views"] += 1
+            stats["time"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["bytes"] += size
+            if status != 200:
+                stats["errors"] += 1
+                logger.warning(f"[{status}] {path}")
+
+            logger.debug(f"{100.0 * (i + 1) / total:.1f}% - [{status}] {seconds:.2f}\t{int(size / 1024)}k\t{path}")
+
+    return report
+
+
+def log_report(report, elapsed):
+    lines = [f"{'endpoint':<28}{'views':>7}{'errors':>8}{'total s':>10}{'mean ms':>10}{'max ms':>10}{'size k':>10}"]
+    for endpoint, stats in sorted(report.items(), key=lambda item: -item[1]["time"]):
+        lines.append(
+            f"{endpoint:<28}{stats['views']:>7}{stats['errors']:>8}{stats['time']:>10.2f}"
+            f"{1000 * stats['time'] / stats['views']:>10.1f}{1000 * stats['max']:>10.1f}"
+            f"{int(stats['bytes'] / 1024):>10}"
+        )
+    views = sum(stats["views"] for stats in report.values())
+    lines.append(f"Rendered {views} views in {elapsed:.2f}s")
+    logger.info("\n".join(lines))
+
+
 if __name__ == "__main__":
     from main import create_app
     app = create_app()
@@ -81,4 +174,12 @@ if __name__ == "__main__":
         logger.info(f"Collected {len(urls)} URLs")
         logger.info("Sample:\n{}".format("\n - ".join(urls[:5])))
 
-        make_requests(urls)
+        if "--in-process" in sys.argv:
+            if not isinstance(cache.cache, RedisCache):
+                logger.warning("The view cache is local to this process and will be discarded")
+
+            start = time.perf_counter()
+            report = render_views(app, urls, processes="--processes" in sys.argv)
+            log_report(report, time.perf_counter() - start)
+        else:
+            make_requests(urls)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Run EXPLAIN ANALYZE on the queries behind the API views
+
+Prints the plan and timing of every query, so that plan regressions (e.g. a
+sequential scan where an index should be used) show up after schema or data
+changes. Pass `--summary` to print timings only.
+
+"""
+import sys
+
+sys.path.append("./app/")
+
+from main import create_app
+from models import Election, Position, QuizAnswer, Result, Tag, Thesis, tags
+from services import db
+from sqlalchemy import func, select
+
+
+def gen_queries():
+    """Return (name, statement) pairs of the queries run by the views."""
+    election_id = db.session.execute(select(func.max(Election.id))).scalar()
+    thesis_ids = db.session.execute(
+        select(Thesis.id).where(Thesis.election_id == election_id)
+    ).scalars().all()
+    tag = db.session.execute(
+        select(Tag).join(Tag.theses).group_by(Tag.title).order_by(func.count().desc())
+    ).scalars().first()
+
+    return [
+        ("elections", select(Election)),
+        ("results of elections", select(Result).where(Result.election_id.in_([election_id]))),
+        (
+            "tags with thesis count",
+            select(Tag, func.count(Thesis.id)).join(Tag.theses).group_by(Tag.title),
+        ),
+        ("tag by slug", select(Tag).where(Tag.slug == tag.slug)),
+        ("tag by wikidata id", select(Tag).where(Tag.wikidata_id == tag.wikidata_id)),
+        ("theses of election", select(Thesis).where(Thesis.election_id == election_id)),
+        ("theses of tag", select(Thesis).join(Thesis.tags).where(Tag.title == tag.title)),
+        (
+            "tags of theses",
+            select(tags.c.thesis_id, Tag).join(Tag, Tag.title == tags.c.tag_title)
+            .where(tags.c.thesis_id.in_(thesis_ids)),
+        ),
+        ("positions of theses", select(Position).where(Position.thesis_id.in_(thesis_ids))),
+        ("tag graph", select(tags.c.tag_title, tags.c.thesis_id)),
+        ("quiz tallies of election", Thesis.quiz_tallies_query(election_id=election_id)),
+        (
+            "quiz answers of thesis",
+            select(QuizAnswer).where(QuizAnswer.thesis_id == thesis_ids[0]),
+        ),
+    ]
+
+
+def explain(statement):
+    """Return the lines of the EXPLAIN ANALYZE output for a statement."""
+    compiled = statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    return db.session.connection().exec_driver_sql(
+        f"EXPLAIN (ANALYZE, BUFFERS) {compiled}", compiled.params
+    ).scalars().all()
+
+
+if __name__ == '__main__':
+    app = create_app()
+    summary = "--summary" in sys.argv
+
+    with app.app_context():
+        for name, statement in gen_queries():
+            plan = explain(statement)
+            timings = [line for line in plan if line.endswith(" ms")]
+            if summary:
+                print(f"{name:<28}" + "  ".join(line.strip() for line in timings))
+            else:
+                print(f"-- {name}")
+                print("\n".join(plan))
+                print()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Rebuild the live quiz tallies in Redis from the quiz_answer table
+
+Run this after deploying and whenever Redis lost its data.
+
+"""
+import sys
+from collections import defaultdict
+
+sys.path.append("./app/")
+
+from main import create_app
+from middleware.logger import logger
+from models import Thesis
+from services import db
+from services.quiz_tally import tally
+from sqlalchemy import select
+
+
+def gen_tallies():
+    """Count yes and no answers for every thesis, grouped by election."""
+    tallies = defaultdict(dict)
+
+    election_ids = dict(db.session.execute(select(Thesis.id, Thesis.election_id)).all())
+    for thesis_id, counts in Thesis.quiz_tallies().items():
+        tallies[election_ids[thesis_id]][int(thesis_id[-2:])] = counts
+
+    return tallies
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        if tally.client is None:
+            logger.error("QUIZ_TALLY_REDIS_URL is not configured")
+            sys.exit(1)
+
+        tallies = gen_tallies()
+        for election_id, election_tally in tallies.items():
+            tally.store(election_id, election_tally)
+        logger.info(f"Rebuilt quiz tallies of {len(tallies)} elections")
@@ -0,0 +1,116 @@
+"""Cached views are evicted precisely when admin writes commit."""
+
+from middleware.cache import view_key
+from services import cache as _cache
+
+VIEWS = [
+    "/v3/base",
+    "/v3/tags/",
+    "/v3/tags.json",
+    "/v3/tags/schule",
+    "/v3/elections/1",
+    "/v3/thesis/WOM-001-01",
+    "/v3/thesis/WOM-001-02",
+]
+
+
+def _fill(client):
+    for path in VIEWS:
+        assert client.get(path).status_code == 200
+
+
+def _cached(app):
+    with app.app_context():
+        return {path for path in VIEWS if _cache.get(view_key(path)) is not None}
+
+
+def test_views_are_cached(client, app):
+    _fill(client)
+    assert _cached(app) == set(VIEWS)
+
+
+def test_adding_new_tag_evicts_only_affected_views(client, admin_key, app):
+    _fill(client)
+
+    r = client.post(
+        "/v3/thesis/WOM-001-02/tags/",
+        json={
+            "admin_key": admin_key,
+            "add": [
+                {
+                    "wikidata_id": "Q999",
+                    "title": "Kitas",
+                    "url": "https://example.org/kitas",
+                }
+            ],
+        },
+    )
+    assert r.get_json()["error"] is None
+
+    # Schule shares no thesis with Kitas, so its pages stay cached
+    assert _cached(app) == {"/v3/tags/schule", "/v3/thesis/WOM-001-01"}
+
+    r = client.get("/v3/tags/")
+    assert "kitas" in [tag["slug"] for tag in r.get_json()["data"]]
+
+
+def test_removing_tag_evicts_its_pages(client, admin_key, app):
+    _fill(client)
+
+    r = client.post(
+        "/v3/thesis/WOM-001-01/tags/",
+        json={"admin_key": admin_key, "remove": ["Schule"]},
+    )
+    assert r.get_json()["error"] is None
+
+    assert _cached(app) == {"/v3/thesis/WOM-001-02"}
+
+    r = client.get("/v3/thesis/WOM-001-01")
+    assert r.get_json()["data"]["tags"] == []
+
+
+def test_invalid_admin_key_evicts_nothing(client, app):
+    _fill(client)
+
+    client.post(
+        "/v3/thesis/WOM-001-01/tags/",
+        json={"admin_key": "nope", "remove": ["Schule"]},
+    )
+
+    assert _cached(app) == set(VIEWS)
+
+
+def test_tag_delete_evicts_its_pages(client, admin_key, app):
+    _fill(client)
+
+    r = client.delete("/v3/tags/schule", json={"admin_key": admin_key})
+    assert r.status_code == 200
+
+    assert _cached(app) == {"/v3/thesis/WOM-001-02"}
+
+    r = client.get("/v3/tags/")
+    assert r.get_json()["data"] == []
+
+
+def test_eviction_removes_all_variants(client, admin_key, app):
+    assert client.get("/v3/tags/?include_theses_ids=1").status_code == 200
+    with app.app_context():
+        assert _cache.get(view_key("/v3/tags/", ["include_theses_ids"])) is not None
+
+    client.delete("/v3/tags/schule", json={"admin_key": admin_key})
+
+    with app.app_context():
+        assert _cache.get(view_key("/v3/tags/", ["include_theses_ids"])) is None
+
+
+def test_eviction_removes_valued_variants(client, admin_key, app):
+    assert client.get("/v3/thesis/WOM-001-01?format=normalized").status_code == 200
+    with app.app_context():
+        key = view_key("/v3/thesis/WOM-001-01", ["format=normalized"])
+        assert key.endswith("?format=normalized")
+        assert _cache.get(key) is not None
+
+    client.delete("/v3/tags/schule", json={"admin_key": admin_key})
+
+    with app.app_context():
+        assert _cache.get(key) is None
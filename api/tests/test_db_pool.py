@@ -0,0 +1,77 @@
+"""Connection pool configuration and metrics."""
+
+import pytest
+import sqlalchemy as sa
+from services.db_pool import (
+    InstrumentedQueuePool,
+    engine_options,
+    instrument_engine,
+    metrics,
+)
+from sqlalchemy.pool import NullPool
+
+
+@pytest.fixture
+def make_engine(app):
+    engines = []
+
+    def make_engine(config):
+        engine = sa.create_engine(app.config["SQLALCHEMY_DATABASE_URI"], **engine_options(config))
+        instrument_engine(engine, config)
+        engines.append(engine)
+        return engine
+
+    yield make_engine
+
+    for engine in engines:
+        if engine.pool in metrics.pools:
+            metrics.pools.remove(engine.pool)
+        engine.dispose()
+
+
+def statement_timeout(engine):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("SHOW statement_timeout").scalar()
+
+
+def test_engine_options():
+    options = engine_options(
+        {"DB_POOL_SIZE": 3, "SQLALCHEMY_ENGINE_OPTIONS": {"pool_timeout": 1}}
+    )
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == 3
+    assert options["pool_timeout"] == 1
+
+    assert engine_options({"DB_PGBOUNCER": True})["poolclass"] is NullPool
+
+
+def test_statement_timeout(make_engine):
+    assert statement_timeout(make_engine({"DB_STATEMENT_TIMEOUT": 1234})) == "1234ms"
+
+
+def test_statement_timeout_with_pgbouncer(make_engine):
+    engine = make_engine({"DB_PGBOUNCER": True, "DB_STATEMENT_TIMEOUT": 1234})
+    assert statement_timeout(engine) == "1234ms"
+
+    # Set again for every transaction, which might use another server connection
+    with engine.connect() as conn:
+        conn.commit()
+        assert conn.exec_driver_sql("SHOW statement_timeout").scalar() == "1234ms"
+
+
+def test_pool_metrics(make_engine, monkeypatch):
+    monkeypatch.setattr(metrics, "pools", [])
+    metrics.reset()
+    engine = make_engine({"DB_POOL_SIZE": 1, "DB_MAX_OVERFLOW": 1, "DB_POOL_TIMEOUT": 0.01})
+
+    with engine.connect(), engine.connect():
+        assert metrics.snapshot()["checked_out"] == 2
+        with pytest.raises(sa.exc.TimeoutError):
+            engine.connect()
+
+    stats = metrics.snapshot()
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 3
+    assert stats["overflows"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["max_wait"] >= 0.01
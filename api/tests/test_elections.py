@@ -25,3 +25,14 @@ def test_specific_election(client):
 def test_unknown_election_404(client):
     r = client.get("/v3/elections/999")
     assert r.status_code == 404
+
+
+def test_election_normalized(client):
+    embedded = client.get("/v3/elections/1").get_json()
+    normalized = client.get("/v3/elections/1?format=normalized").get_json()
+
+    assert normalized["data"] == embedded["data"]
+    for thesis in embedded["theses"]:
+        thesis["tags"] = [tag["slug"] for tag in thesis["tags"]]
+    assert normalized["theses"] == embedded["theses"]
+    assert list(normalized["tags"]) == ["schule"]
@@ -0,0 +1,50 @@
+"""Responses serialized with orjson are byte for byte those of Flask's default."""
+
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+from markupsafe import Markup
+from middleware.json_provider import COMPACT_SEPARATORS
+
+
+@dataclass
+class Point:
+    x: int
+    y: float
+
+
+@pytest.fixture
+def stdlib_dumps(app):
+    provider = DefaultJSONProvider(app)
+    return lambda obj: provider.dumps(obj, separators=COMPACT_SEPARATORS).encode()
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {"b": 1, "a": [1.5, -0.0, 50.0, 1e16, 1e-7, 123456789.123, 2**70]},
+        {"text": "Straßenbahn für Ü\x7f  \U0001f600 \"quoted\" \\ / \x00\x1f\t\n"},
+        {"nested": {"z": None, "y": True, "x": [{"d": "e"}, (), {}]}},
+        {1: "one", 10: "ten", 2: "two"},
+        {"when": datetime(2024, 1, 1, 12, 30), "day": date(2024, 1, 1)},
+        {"id": uuid.UUID(int=1), "amount": Decimal("1.10"), "point": Point(1, 2.5)},
+        {"html": Markup("<b>x</b>"), "mentions 1e-7 in text": "3e+5 votes"},
+    ],
+)
+def test_dumps_matches_stdlib(app, stdlib_dumps, obj):
+    assert app.json.dumps_bytes(obj) == stdlib_dumps(obj)
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/v3/base", "/v3/elections/?thesis_data=1", "/v3/elections/1", "/v3/tags.json",
+     "/v3/tags/schule", "/v3/thesis/WOM-001-01", "/v3/quiz/1"],
+)
+def test_responses_match_stdlib(client, stdlib_dumps, path):
+    body = client.get(path).data
+    assert body == stdlib_dumps(json.loads(body)) + b"\n"
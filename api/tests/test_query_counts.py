@@ -0,0 +1,84 @@
+"""Every view runs a fixed number of queries, however much data it shows."""
+
+import pytest
+from middleware import query_stats
+from middleware.query_stats import QueryBudgetExceeded
+from models import Position, Tag, Thesis
+from models.tag_graph import tag_graph
+from sqlalchemy import event
+
+
+@pytest.fixture
+def more_data(db):
+    """Add theses and tags, so that N+1 queries would show up in the counts."""
+    schule = db.session.get(Tag, "Schule")
+    for n in range(3, 7):
+        thesis = Thesis(id=f"WOM-001-{n:02d}", title=f"Thesis {n}", text="Text", election_id=1)
+        thesis.positions.append(Position(party_name="TEST", value=-1))
+        thesis.tags.append(schule)
+        thesis.tags.append(
+            Tag(title=f"Tag {n}", slug=f"tag-{n}", url=f"https://example.org/tag-{n}")
+        )
+        db.session.add(thesis)
+    db.session.commit()
+
+    # Build the tag graph up front, its queries run only once per dataset version
+    tag_graph()
+
+
+@pytest.fixture
+def queries(db):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", record)
+
+
+@pytest.mark.parametrize(
+    "path, count",
+    [
+        ("/v3/base", 3),
+        ("/v3/elections/", 2),
+        ("/v3/elections/?thesis_data=1", 3),
+        ("/v3/elections/1", 5),
+        ("/v3/elections/1?fields[election]=title&fields[thesis]=title", 2),
+        ("/v3/tags/", 1),
+        ("/v3/tags/?include_theses_ids=1", 2),
+        ("/v3/tags/schule", 6),
+        ("/v3/tags/schule?format=normalized", 6),
+        (
+            "/v3/tags/schule?fields[thesis]=title&fields[tag]=title,related_tags"
+            "&fields[election]=title",
+            3,
+        ),
+        ("/v3/thesis/WOM-001-03", 6),
+    ],
+)
+def test_query_count(client, more_data, queries, path, count):
+    assert client.get(path).status_code == 200
+    assert len(queries) == count, "\n\n".join(queries)
+
+
+def test_query_stats_in_meta(client, more_data):
+    meta = client.get("/v3/elections/?thesis_data=1").get_json()["meta"]
+    assert meta["queries"]["count"] == 3
+    assert meta["queries"]["time"].endswith("s")
+
+
+def test_query_budget_fails_tests(app, client, monkeypatch):
+    monkeypatch.setattr(app.view_functions["tags.tags_view"], "query_budget", 0)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/v3/tags/")
+
+
+def test_query_budget_warns(app, client, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(query_stats.logger, "warning", warnings.append)
+    monkeypatch.setattr(app.view_functions["tags.tags_view"], "query_budget", 0)
+    monkeypatch.setitem(app.config, "QUERY_BUDGET_STRICT", False)
+    assert client.get("/v3/tags/").status_code == 200
+    assert len(warnings) == 1 and "its budget is 0" in warnings[0]
@@ -1,5 +1,11 @@
 """Ported from tests/test_quiz_answers.tavern.yaml."""
 
+import fakeredis
+import pytest
+from models import Thesis
+from services.quiz_tally import tally, tally_key
+from sqlalchemy import event
+
 
 def test_quiz_get(client):
     r = client.get("/v3/quiz/1")
@@ -52,3 +58,63 @@ def test_quiz_post_unknown_election(client):
         json={"uuid": "test-uuid2", "answer": 1},
     )
     assert r.status_code == 404
+
+
+@pytest.fixture
+def redis_tally(monkeypatch):
+    monkeypatch.setattr(tally, "client", fakeredis.FakeStrictRedis())
+    return tally
+
+
+def test_quiz_get_stores_tally_from_database(client, redis_tally):
+    client.post("/v3/quiz/001/01", json={"uuid": "test-uuid", "answer": -1})
+    redis_tally.client.delete(tally_key(1))
+
+    r = client.get("/v3/quiz/1")
+    assert r.get_json()["data"] == {"1": [0, 1], "2": [0, 0]}
+    assert redis_tally.get(1) == {1: [0, 1], 2: [0, 0]}
+
+
+def test_quiz_post_increments_tally(client, redis_tally):
+    client.get("/v3/quiz/1")
+
+    client.post("/v3/quiz/001/01", json={"uuid": "test-uuid", "answer": 1})
+    client.post("/v3/quiz/001/01", json={"uuid": "other-uuid", "answer": 1})
+    client.post("/v3/quiz/001/02", json={"uuid": "test-uuid", "answer": -1})
+    # Duplicates are not counted
+    client.post("/v3/quiz/001/02", json={"uuid": "test-uuid", "answer": -1})
+
+    r = client.get("/v3/quiz/1")
+    assert r.get_json()["data"] == {"1": [2, 0], "2": [0, 1]}
+
+
+def test_incomplete_tally_is_not_trusted(client, redis_tally):
+    client.post("/v3/quiz/001/01", json={"uuid": "test-uuid", "answer": 1})
+    assert redis_tally.get(1) is None
+
+    r = client.get("/v3/quiz/1")
+    assert r.get_json()["data"]["1"] == [1, 0]
+
+
+
+def test_quiz_tallies_use_one_query(client, db):
+    client.post("/v3/quiz/001/01", json={"uuid": "test-uuid", "answer": 1})
+    client.post("/v3/quiz/001/01", json={"uuid": "other-uuid", "answer": -1})
+    client.post("/v3/quiz/001/02", json={"uuid": "test-uuid", "answer": -1})
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        assert Thesis.quiz_tallies(election_id=1) == {
+            "WOM-001-01": (1, 1),
+            "WOM-001-02": (0, 1),
+        }
+        assert Thesis.quiz_tallies(thesis_ids=["WOM-001-02"]) == {"WOM-001-02": (0, 1)}
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    assert len(statements) == 2
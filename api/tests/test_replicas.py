@@ -0,0 +1,98 @@
+"""Read-only requests are served from replicas, everything else from the primary."""
+
+import pytest
+import sqlalchemy as sa
+from models import Thesis
+from services.replicas import replicas
+from sqlalchemy import event
+
+
+@pytest.fixture
+def replica_queries(app, db, monkeypatch):
+    """Two replica engines connected to the test database.
+
+    Yields the statements run on the primary and on each replica.
+    """
+    url = app.config["SQLALCHEMY_DATABASE_URI"]
+    engines = [sa.create_engine(url), sa.create_engine(url)]
+    monkeypatch.setattr(replicas, "engines", engines)
+    monkeypatch.setattr(replicas, "_down_until", {})
+
+    statements = {engine: [] for engine in [db.engine, *engines]}
+    listeners = []
+    for engine, recorded in statements.items():
+
+        def record(conn, cursor, statement, *args, recorded=recorded):
+            recorded.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        listeners.append((engine, record))
+
+    # Start over with a session that has not written anything yet
+    db.session.remove()
+    yield [statements[db.engine], *(statements[engine] for engine in engines)]
+
+    for engine, record in listeners:
+        event.remove(engine, "before_cursor_execute", record)
+    for engine in engines:
+        engine.dispose()
+
+
+def test_reads_alternate_between_replicas(client, replica_queries):
+    primary, first, second = replica_queries
+
+    assert client.get("/v3/elections/").status_code == 200
+    assert client.get("/v3/elections/?thesis_data=1").status_code == 200
+
+    assert primary == []
+    assert first and second
+
+
+def test_writes_go_to_primary(client, admin_key, replica_queries):
+    primary, first, second = replica_queries
+
+    rv = client.delete("/v3/tags/schule", json={"admin_key": admin_key})
+
+    assert rv.status_code == 200
+    assert any(statement.startswith("DELETE") for statement in primary)
+    assert first == second == []
+
+
+def test_session_reads_its_own_writes(app, db, replica_queries):
+    primary, first, second = replica_queries
+
+    with app.test_request_context("/v3/elections/"):
+        db.session.get(Thesis, "WOM-001-01").title = "Changed"
+        db.session.flush()
+        assert db.session.get(Thesis, "WOM-001-02") is not None
+        db.session.rollback()
+
+    # Only the query before the write went to a replica
+    assert len(first + second) == 1
+    assert primary[0].startswith("UPDATE thesis")
+    assert primary[1].startswith("SELECT thesis")
+
+
+def test_unavailable_replicas_are_skipped(client, replica_queries):
+    primary, first, second = replica_queries
+
+    replicas.mark_down(replicas.engines[0])
+    client.get("/v3/elections/")
+    client.get("/v3/elections/?thesis_data=1")
+    assert first == [] and second
+
+    replicas.mark_down(replicas.engines[1])
+    client.get("/v3/tags/")
+    assert primary
+
+
+def test_failing_replica_is_marked_down(monkeypatch):
+    engine = sa.create_engine("postgresql://metawahl@127.0.0.1:1/metawahl")
+    monkeypatch.setattr(replicas, "engines", [engine])
+    monkeypatch.setattr(replicas, "_down_until", {})
+    event.listen(engine, "handle_error", replicas._handle_error)
+
+    with pytest.raises(sa.exc.OperationalError):
+        engine.connect()
+
+    assert replicas.choose() is None
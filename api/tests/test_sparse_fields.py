@@ -0,0 +1,42 @@
+"""Sparse fieldsets with fields[<type>] parameters."""
+
+from middleware.cache import fields_variant_key, view_key
+from services import cache as _cache
+
+
+def test_only_requested_fields(client):
+    rv = client.get(
+        "/v3/elections/1?fields[election]=title&fields[thesis]=title,tags&fields[tag]=title"
+    ).get_json()
+
+    assert rv["data"] == {"id": 1, "title": "Test Wahl"}
+    assert rv["theses"][0] == {
+        "id": "WOM-001-01",
+        "title": "Thesis 1",
+        "tags": [{"slug": "schule", "title": "Schule"}],
+    }
+
+
+def test_unknown_fields_are_ignored(client):
+    full = client.get("/v3/thesis/WOM-001-01").get_json()
+    rv = client.get("/v3/thesis/WOM-001-01?fields[thesis]=bogus&fields[bogus]=id").get_json()
+
+    assert rv["data"] == {"id": "WOM-001-01"}
+    assert rv["related"] == full["related"]
+
+
+def test_fieldsets_share_canonical_key(client, app):
+    client.get("/v3/tags/?fields[tag]=title,slug,bogus")
+
+    with app.app_context():
+        key = fields_variant_key(view_key("/v3/tags/", ["fields[tag]=slug,title"]))
+        assert _cache.get(key) is not None
+
+
+def test_fieldset_variants_are_evicted(client, admin_key):
+    path = "/v3/thesis/WOM-001-01?fields[thesis]=tags&fields[tag]=title"
+    assert client.get(path).get_json()["data"]["tags"] == [{"slug": "schule", "title": "Schule"}]
+
+    client.delete("/v3/tags/schule", json={"admin_key": admin_key})
+
+    assert client.get(path).get_json()["data"]["tags"] == []
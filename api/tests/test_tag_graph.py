@@ -0,0 +1,108 @@
+"""In-memory tag co-occurrence graph behind related tags."""
+
+from models import Tag, Thesis
+from models.tag_graph import TagGraph, tag_graph
+from services import cache as _cache
+from services.dataset_version import VERSION_KEY
+
+
+def _state(graph):
+    return (
+        {tag: theses for tag, theses in graph.theses.items() if theses},
+        {tag: dict(counts) for tag, counts in graph.pairs.items() if counts},
+        graph.slugs,
+    )
+
+
+def _add_tags(db):
+    first = db.session.get(Thesis, "WOM-001-01")
+    second = db.session.get(Thesis, "WOM-001-02")
+    bildung = Tag(title="Bildung", slug="bildung")
+    first.tags.extend([bildung, Tag(title="Kitas", slug="kitas")])
+    second.tags.append(bildung)
+    db.session.commit()
+
+
+def test_graph_counts_shared_theses(app, db):
+    _add_tags(db)
+
+    graph = tag_graph()
+    assert graph.thesis_count("Bildung") == 2
+    assert graph.related("Schule") == {"Bildung": 1, "Kitas": 1}
+    assert graph.related("Bildung") == {"Schule": 1, "Kitas": 1}
+    assert graph.slugs["Kitas"] == "kitas"
+
+
+def test_graph_is_updated_incrementally(app, db):
+    graph = tag_graph()
+    _add_tags(db)
+
+    thesis = db.session.get(Thesis, "WOM-001-01")
+    thesis.tags.remove(db.session.get(Tag, "Kitas"))
+    db.session.delete(db.session.get(Tag, "Schule"))
+    db.session.commit()
+
+    # Updated in place by the committing worker
+    assert tag_graph() is graph
+    assert _state(graph) == _state(TagGraph.build())
+    assert graph.related("Bildung") == {}
+
+
+def test_graph_is_rebuilt_when_another_worker_changed_tags(app, db):
+    graph = tag_graph()
+    _cache.set(VERSION_KEY, 1, timeout=0)
+
+    assert tag_graph() is not graph
+    assert tag_graph().version == 1
+
+
+def test_related_tags_from_graph(client, db):
+    _add_tags(db)
+
+    r = client.get("/v3/tags/bildung")
+    related = r.get_json()["data"]["related_tags"]
+    assert related["parents"] == {}
+    assert related["linked"]["Schule"]["count"] == 1
+    assert related["linked"]["Schule"]["tag"]["wikidata_id"] == "Q123"
+
+    r = client.get("/v3/tags/schule")
+    related = r.get_json()["data"]["related_tags"]
+    assert sorted(related["parents"]) == ["Bildung", "Kitas"]
+
+    r = client.get("/v3/base")
+    roots = {tag["slug"]: tag["root"] for tag in r.get_json()["data"]["tags"]}
+    assert roots == {"bildung": True, "kitas": False, "schule": False}
+
+
+def test_related_theses_are_scored_by_tag_size(app, db):
+    schule = db.session.get(Tag, "Schule")
+    kitas = Tag(title="Kitas", slug="kitas")
+    for n in range(3, 8):
+        thesis = Thesis(id=f"WOM-001-{n:02d}", text="Text", election_id=1)
+        thesis.tags.append(kitas)
+        if n < 5:
+            thesis.tags.append(schule)
+        db.session.add(thesis)
+    db.session.commit()
+
+    # Schule is on theses 1, 3 and 4, Kitas on theses 3 to 7
+    graph = tag_graph()
+    assert graph.related_theses("WOM-001-01") == ["WOM-001-04", "WOM-001-03"]
+    assert graph.related_theses("WOM-001-03") == [
+        "WOM-001-04",
+        "WOM-001-01",
+        "WOM-001-07",
+        "WOM-001-06",
+        "WOM-001-05",
+    ]
+    assert graph.related_theses("WOM-001-02") == []
+
+
+def test_thesis_view_lists_related_theses(client, db):
+    thesis = db.session.get(Thesis, "WOM-001-02")
+    thesis.tags.append(db.session.get(Tag, "Schule"))
+    db.session.commit()
+
+    r = client.get("/v3/thesis/WOM-001-01")
+    assert [related["id"] for related in r.get_json()["related"]] == ["WOM-001-02"]
+    assert r.get_json()["related"][0]["tags"][0]["slug"] == "schule"
@@ -29,3 +29,15 @@ def test_specific_tag(client):
 def test_unknown_tag_404(client):
     r = client.get("/v3/tags/_schule")
     assert r.status_code == 404
+
+
+def test_specific_tag_normalized(client):
+    embedded = client.get("/v3/tags/schule").get_json()
+    r = client.get("/v3/tags/schule?format=normalized")
+    assert r.status_code == 200
+
+    normalized = r.get_json()
+    assert normalized["data"] == embedded["data"]
+    assert normalized["elections"] == embedded["elections"]
+    assert [thesis["tags"] for thesis in normalized["theses"]] == [["schule"]]
+    assert normalized["tags"] == {"schule": embedded["theses"][0]["tags"][0]}
@@ -0,0 +1,95 @@
+"""In-process L1 cache in front of Redis, using fakeredis as the server."""
+
+import fakeredis
+import pytest
+from services.tiered_cache import TieredRedisCache
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def _worker(server, **kwargs):
+    kwargs.setdefault("generation_interval", 0)
+    return TieredRedisCache(
+        host=fakeredis.FakeStrictRedis(server=server),
+        key_prefix="test_",
+        **kwargs,
+    )
+
+
+def test_second_get_is_served_from_l1(server):
+    cache = _worker(server)
+    cache.set("view//v3/base", {"data": 1})
+
+    other = _worker(server)
+    assert other.get("view//v3/base") == {"data": 1}
+    assert other.get("view//v3/base") == {"data": 1}
+
+    stats = other.stats()
+    assert stats["l2_hits"] == 1
+    assert stats["l1_hits"] == 1
+    assert stats["l1_hit_ratio"] == 0.5
+    assert stats["l2_hit_ratio"] == 1.0
+
+
+def test_l1_hit_needs_no_redis(server):
+    cache = _worker(server, generation_interval=60)
+    cache.set("view//v3/base", "cached")
+
+    # Remove the value behind the worker's back
+    fakeredis.FakeStrictRedis(server=server).delete("test_view//v3/base")
+
+    assert cache.get("view//v3/base") == "cached"
+
+
+def test_miss_is_counted(server):
+    cache = _worker(server)
+    assert cache.get("view//v3/nothing") is None
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["l2_hit_ratio"] == 0.0
+
+
+def test_delete_invalidates_other_workers(server):
+    first = _worker(server)
+    second = _worker(server)
+
+    first.set("view//v3/base", "old")
+    assert second.get("view//v3/base") == "old"
+
+    first.delete("view//v3/base")
+    assert second.get("view//v3/base") is None
+
+    first.set("view//v3/base", "new")
+    assert second.get("view//v3/base") == "new"
+
+
+def test_delete_many_returns_deleted_keys(server):
+    cache = _worker(server)
+    cache.set("view/a", 1)
+    cache.set("view/b", 2)
+
+    assert cache.delete_many("view/a", "view/b", "view/c") == ["view/a", "view/b"]
+    assert cache.get("view/a") is None
+
+
+def test_l1_is_bounded_by_bytes(server):
+    cache = _worker(server, l1_max_bytes=2000)
+    for i in range(10):
+        cache.set(f"view/{i}", "x" * 500)
+
+    stats = cache.stats()
+    assert stats["l1_bytes"] <= 2000
+    assert stats["l1_items"] < 10
+
+    # Least recently used keys were evicted from L1 but remain in Redis
+    assert cache.get("view/0") == "x" * 500
+    assert cache.stats()["l2_hits"] == 1
+
+
+def test_other_keys_bypass_l1(server):
+    cache = _worker(server)
+    cache.set("lock/view/a", 1)
+    assert cache.stats()["l1_items"] == 0
+    assert cache.get("lock/view/a") == 1
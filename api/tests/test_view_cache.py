@@ -0,0 +1,171 @@
+"""Stale-while-revalidate, compression and revalidation of cached views."""
+
+import gzip
+import threading
+
+import brotli
+import middleware.cache
+import pytest
+from middleware.cache import view_key
+from models import Tag
+from services import cache as _cache
+from sqlalchemy import update
+
+PATH = "/v3/tags/schule"
+
+
+@pytest.fixture
+def refreshes(app, monkeypatch):
+    """Run background refreshes to completion and record them."""
+    monkeypatch.setitem(app.config, "CACHE_STALE_TIMEOUT", 60)
+    calls = []
+
+    def spawn(fn):
+        calls.append(fn)
+        thread = threading.Thread(target=fn)
+        thread.start()
+        thread.join()
+
+    monkeypatch.setattr(middleware.cache, "spawn", spawn)
+    return calls
+
+
+def _expire(app):
+    with app.app_context():
+        record = _cache.get(view_key(PATH))
+        record["fresh_until"] = 0
+        _cache.set(view_key(PATH), record)
+
+
+def _describe(db):
+    # Bypasses the ORM so that the cached view is not evicted
+    db.session.execute(
+        update(Tag).where(Tag.slug == "schule").values(description="Bildung")
+    )
+    db.session.commit()
+
+
+def test_fresh_view_is_not_refreshed(client, db, refreshes):
+    client.get(PATH)
+    _describe(db)
+
+    r = client.get(PATH)
+    assert "description" not in r.get_json()["data"]
+    assert refreshes == []
+
+
+def test_stale_view_is_served_while_refreshing(client, db, app, refreshes):
+    client.get(PATH)
+    _describe(db)
+    _expire(app)
+
+    r = client.get(PATH)
+    assert r.status_code == 200
+    assert "description" not in r.get_json()["data"]
+    assert len(refreshes) == 1
+
+    r = client.get(PATH)
+    assert r.get_json()["data"]["description"] == "Bildung"
+    assert len(refreshes) == 1
+
+    with app.app_context():
+        assert _cache.get(f"lock/{view_key(PATH)}") is None
+
+
+def test_refresh_is_single_flight(client, db, app, refreshes):
+    client.get(PATH)
+    _expire(app)
+
+    with app.app_context():
+        _cache.add(f"lock/{view_key(PATH)}", 1)
+
+    r = client.get(PATH)
+    assert r.status_code == 200
+    assert refreshes == []
+
+
+def test_stale_period_is_added_to_cache_timeout(client, app, refreshes, monkeypatch):
+    monkeypatch.setitem(app.config, "CACHE_DEFAULT_TIMEOUT", 300)
+    timeouts = []
+    set_ = _cache.set
+
+    def set_and_record(key, value, timeout=None):
+        timeouts.append(timeout)
+        return set_(key, value, timeout=timeout)
+
+    monkeypatch.setattr(_cache, "set", set_and_record)
+
+    client.get(PATH)
+    assert timeouts == [300 + 60]
+
+
+def test_cached_view_is_compressed(client, db):
+    tag = db.session.query(Tag).filter_by(slug="schule").one()
+    tag.description = "Bildungspolitik " * 100
+    db.session.commit()
+
+    plain = client.get(PATH)
+    assert plain.headers.get("Content-Encoding") is None
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+    r = client.get(PATH, headers={"Accept-Encoding": "gzip"})
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(r.data) == plain.data
+    assert int(r.headers["Content-Length"]) == len(r.data) < len(plain.data)
+
+    r = client.get(PATH, headers={"Accept-Encoding": "gzip, deflate, br"})
+    assert r.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(r.data) == plain.data
+    assert r.headers["ETag"] != plain.headers["ETag"]
+
+
+def test_matching_etag_is_not_modified(client):
+    etag = client.get(PATH).headers["ETag"]
+
+    r = client.get(PATH, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.data == b""
+    assert r.headers["ETag"] == etag
+
+    r = client.get(PATH, headers={"If-None-Match": '"outdated"'})
+    assert r.status_code == 200
+
+
+def test_etag_ignores_render_time(client, app, refreshes):
+    first = client.get(PATH)
+    _expire(app)
+    client.get(PATH)
+
+    second = client.get(PATH)
+    assert second.get_json()["meta"]["render_time"] != first.get_json()["meta"]["render_time"]
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_query_variants_are_cached_separately(client, app):
+    plain = client.get("/v3/tags/")
+    assert "theses" not in plain.get_json()["data"][0]
+
+    variant = client.get("/v3/tags/?include_theses_ids=1")
+    assert variant.get_json()["data"][0]["theses"] == ["WOM-001-01"]
+
+    # Unknown parameters and empty values don't create entries of their own
+    for query in ("?utm_source=x", "?include_theses_ids=", "?utm_source=x&include_theses_ids=1"):
+        assert client.get(f"/v3/tags/{query}").status_code == 200
+
+    with app.app_context():
+        keys = [key for key in _cache.cache._cache if key.startswith(view_key("/v3/tags/"))]
+    assert sorted(keys) == [
+        view_key("/v3/tags/"),
+        view_key("/v3/tags/", ["include_theses_ids"]),
+    ]
+
+
+def test_cache_filler_deletes_only_its_variant(client, monkeypatch):
+    client.get("/v3/elections/")
+    client.get("/v3/elections/?thesis_data=1")
+
+    deleted = []
+    monkeypatch.setattr(_cache, "delete", deleted.append)
+
+    client.get("/v3/elections/?thesis_data=1&force_cache_miss")
+    assert deleted == [view_key("/v3/elections/", ["thesis_data"])]